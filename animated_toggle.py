@@ -1,10 +1,17 @@
+from collections import OrderedDict
+
 from PySide2.QtCore import (
     Qt, QSize, QPoint, QPointF, QRectF,
     QEasingCurve, QPropertyAnimation, QSequentialAnimationGroup,
     Slot, Property)
 
 from PySide2.QtWidgets import QCheckBox
-from PySide2.QtGui import QColor, QBrush, QPaintEvent, QPen, QPainter
+from PySide2.QtGui import QColor, QBrush, QPaintEvent, QPen, QPainter, QPixmap
+from instrumentation import instrumentation
+
+FRAME_CACHE_SIZE = 512  # rendered frames shared by all toggles
+HANDLE_POSITION_STEPS = 64  # handle positions per full trail
+PULSE_RADIUS_STEPS = 2  # pulse radii per pixel
 
 
 class AnimatedToggle(QCheckBox):
@@ -12,6 +19,10 @@ class AnimatedToggle(QCheckBox):
     _transparent_pen = QPen(Qt.transparent)
     _light_grey_pen = QPen(Qt.lightGray)
 
+    # Least recently used frames first. Keys hold everything that affects a frame,
+    # so toggles of the same size and colors reuse each other's frames.
+    _frame_cache = OrderedDict()
+
     def __init__(self,
         parent=None,
         bar_color=Qt.gray,
@@ -33,6 +44,10 @@ class AnimatedToggle(QCheckBox):
         self._pulse_unchecked_animation = QBrush(QColor(pulse_unchecked_color))
         self._pulse_checked_animation = QBrush(QColor(pulse_checked_color))
 
+        self._color_key = tuple(brush.color().rgba() for brush in (
+            self._bar_brush, self._bar_checked_brush, self._handle_brush, self._handle_checked_brush,
+            self._pulse_unchecked_animation, self._pulse_checked_animation))
+
         # Setup the rest of the widget.
 
         self.setContentsMargins(8, 0, 8, 0)
@@ -70,12 +85,39 @@ class AnimatedToggle(QCheckBox):
             self.animation.setEndValue(0)
         self.animations_group.start()
 
+    @instrumentation.timed("AnimatedToggle.paintEvent")
     def paintEvent(self, e: QPaintEvent):
-
         contRect = self.contentsRect()
-        handleRadius = round(0.24 * contRect.height())
+        handlePosition = round(self._handle_position * HANDLE_POSITION_STEPS)
+        pulseRadius = None
+        if self.pulse_anim.state() == QPropertyAnimation.Running:
+            pulseRadius = round(self._pulse_radius * PULSE_RADIUS_STEPS)
+        pixelRatio = self.devicePixelRatioF()
+
+        key = (self.width(), self.height(), contRect.getRect(), pixelRatio, self.isChecked(),
+               self._color_key, handlePosition, pulseRadius)
+        frame = self._frame_cache.get(key)
+        if frame is None:
+            frame = self._render_frame(contRect, pixelRatio, handlePosition / HANDLE_POSITION_STEPS,
+                                       None if pulseRadius is None else pulseRadius / PULSE_RADIUS_STEPS)
+            self._frame_cache[key] = frame
+            if len(self._frame_cache) > FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
+        else:
+            self._frame_cache.move_to_end(key)
 
         p = QPainter(self)
+        p.drawPixmap(0, 0, frame)
+        p.end()
+
+    def _render_frame(self, contRect, pixelRatio, handlePosition, pulseRadius):
+        frame = QPixmap(round(self.width() * pixelRatio), round(self.height() * pixelRatio))
+        frame.setDevicePixelRatio(pixelRatio)
+        frame.fill(Qt.transparent)
+
+        handleRadius = round(0.24 * contRect.height())
+
+        p = QPainter(frame)
         p.setRenderHint(QPainter.Antialiasing)
 
         p.setPen(self._transparent_pen)
@@ -89,14 +131,14 @@ class AnimatedToggle(QCheckBox):
         # the handle will move along this line
         trailLength = contRect.width() - 2 * handleRadius
 
-        xPos = contRect.x() + handleRadius + trailLength * self._handle_position
+        xPos = contRect.x() + handleRadius + trailLength * handlePosition
 
-        if self.pulse_anim.state() == QPropertyAnimation.Running:
+        if pulseRadius is not None:
             p.setBrush(
                 self._pulse_checked_animation if
                 self.isChecked() else self._pulse_unchecked_animation)
             p.drawEllipse(QPointF(xPos, barRect.center().y()),
-                          self._pulse_radius, self._pulse_radius)
+                          pulseRadius, pulseRadius)
 
         if self.isChecked():
             p.setBrush(self._bar_checked_brush)
@@ -114,6 +156,7 @@ class AnimatedToggle(QCheckBox):
             handleRadius, handleRadius)
 
         p.end()
+        return frame
 
     @Property(float)
     def handle_position(self):
@@ -0,0 +1,109 @@
+import os
+import wave
+from PySide2 import QtCore
+
+TICKING_SOUND = "ticking-sound.wav"
+BEEPING_SOUND = "beeping-sound.wav"
+TIME_EXCEEDED_SOUND = "time-exceeded-sound.wav"
+TICK_SAMPLE_MILLISECONDS = 1000
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".pypomodoro", "cache")
+
+
+def write_tick_sample(source, destination, milliseconds=TICK_SAMPLE_MILLISECONDS):
+    """Copy the first milliseconds of source into destination, a short WAV that can loop seamlessly."""
+    with wave.open(source, "rb") as source_wave:
+        params = source_wave.getparams()
+        frames = source_wave.readframes(params.framerate*milliseconds // 1000)
+    temporary_destination = destination + ".tmp"
+    with wave.open(temporary_destination, "wb") as destination_wave:
+        destination_wave.setparams(params)
+        destination_wave.writeframes(frames)
+    os.replace(temporary_destination, destination)
+
+
+class SilentSound:
+    """Stands in for a QSoundEffect where the multimedia stack cannot be loaded."""
+
+    def isPlaying(self):
+        return False
+
+    def play(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def deleteLater(self):
+        pass
+
+
+class AudioManager:
+    """Creates each sound effect on first use and releases the large alarm when it stops.
+
+    The ticking sound is a short sample cut from ticking-sound.wav that loops
+    natively while a countdown runs, instead of being restarted on every tick.
+    Where QtMultimedia cannot be loaded, e.g. without a sound server library,
+    the timer runs silently, `available` is False and `last_error` says why.
+    """
+
+    def __init__(self, cache_directory=DEFAULT_CACHE_DIRECTORY):
+        self.cache_directory = cache_directory
+        self.sounds = {}
+        self.available = None  # unknown until the first sound is needed
+        self.last_error = None
+
+    def sound(self, name, loop=False):
+        sound = self.sounds.get(name)
+        if sound is None:
+            if self.available is False:
+                return SilentSound()
+            try:
+                # imported here so the multimedia stack is only loaded once a sound is needed
+                from PySide2.QtMultimedia import QSoundEffect
+            except ImportError as error:
+                self.available = False
+                self.last_error = str(error)
+                return SilentSound()
+            self.available = True
+            sound = QSoundEffect()
+            sound.setSource(QtCore.QUrl.fromLocalFile(self.source_file(name)))
+            sound.setVolume(1.0)
+            if loop:
+                sound.setLoopCount(QSoundEffect.Infinite)
+            self.sounds[name] = sound
+        return sound
+
+    def source_file(self, name):
+        if name != TICKING_SOUND:
+            return name
+        sample = os.path.join(self.cache_directory, f"tick-sample-{TICK_SAMPLE_MILLISECONDS}ms.wav")
+        if not os.path.exists(sample):
+            os.makedirs(self.cache_directory, exist_ok=True)
+            write_tick_sample(TICKING_SOUND, sample)
+        return sample
+
+    def start_ticking(self):
+        ticking_sound = self.sound(TICKING_SOUND, loop=True)
+        if not ticking_sound.isPlaying():
+            ticking_sound.play()
+
+    def stop_ticking(self):
+        if TICKING_SOUND in self.sounds:
+            self.sounds[TICKING_SOUND].stop()
+
+    def play_alarm(self, in_pomodoro):
+        self.stop_ticking()
+        alarm = self.sound(TIME_EXCEEDED_SOUND if in_pomodoro else BEEPING_SOUND)
+        alarm.stop()
+        alarm.play()
+
+    def release(self, name):
+        sound = self.sounds.pop(name, None)
+        if sound is not None:
+            sound.stop()
+            sound.deleteLater()
+
+    def stop_all(self):
+        for sound in self.sounds.values():
+            sound.stop()
+        self.release(TIME_EXCEEDED_SOUND)
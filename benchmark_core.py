@@ -0,0 +1,59 @@
+import argparse
+import json
+from time import perf_counter
+from pomodorocore import PomodoroCore, POMODORO_TIME, SHORT_BREAK_TIME
+from stopwatch import ManualClock
+
+
+def simulate(cycles):
+    clock = ManualClock()
+    core = PomodoroCore(clock=clock)
+    events = []
+    core.subscribe(lambda event, _: events.append(event))
+
+    for cycle in range(cycles):
+        core.start()
+        clock.advance(POMODORO_TIME // 3)
+        if cycle % 4 == 0:
+            core.pause_resume()
+            core.non_pomodoro_start()
+            clock.advance(2*60*1000)
+            core.non_pomodoro_stop()
+            core.pause_resume()
+        clock.advance(POMODORO_TIME)
+        core.tick()
+        core.stop()
+        core.start()
+        clock.advance(SHORT_BREAK_TIME)
+        core.tick()
+        core.stop()
+        if len(events) > 100000:
+            events.clear()
+
+    return core
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate accelerated pomodoro/break cycles on a manual clock.")
+    parser.add_argument("--cycles", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.repeat):
+        started = perf_counter()
+        core = simulate(args.cycles)
+        elapsed = perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    assert core.total_pomodoro_count == args.cycles
+    print(json.dumps({
+        "benchmark": "core_cycles",
+        "cycles": args.cycles,
+        "seconds": round(best, 4),
+        "cycles_per_second": round(args.cycles / best),
+    }))
+
+
+if __name__ == '__main__':
+    main()
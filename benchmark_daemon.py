@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from time import perf_counter
+from timerdaemon import TimerDaemon
+
+CYCLE = ["start", "pause_resume", "non_pomodoro_start", "non_pomodoro_stop", "pause_resume", "stop", "skip",
+         "status"]
+
+
+async def client(socket_path, sessions, rounds, latencies):
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    request_id = 0
+    for _ in range(rounds):
+        for session in sessions:
+            for command in CYCLE:
+                request_id += 1
+                started = perf_counter()
+                writer.write((json.dumps({"id": request_id, "session": session, "command": command}) + "\n").encode())
+                response = json.loads(await reader.readline())
+                latencies.append(perf_counter() - started)
+                if not response["ok"]:
+                    raise RuntimeError(f"{session} {command}: {response['error']}")
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, "daemon.sock")
+        daemon = TimerDaemon()
+        server = await daemon.serve(socket_path=socket_path)
+        async with server:
+            names = [f"user{number}" for number in range(args.sessions)]
+            latencies = []
+            started = perf_counter()
+            await asyncio.gather(*(client(socket_path, names[offset::args.clients], args.rounds, latencies)
+                                   for offset in range(args.clients)))
+            elapsed = perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(fraction):
+        return round(latencies[min(len(latencies) - 1, int(fraction*len(latencies)))]*1000, 4)
+
+    print(json.dumps({
+        "benchmark": "daemon",
+        "sessions": len(daemon.sessions),
+        "clients": args.clients,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed),
+        "latency_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": percentile(1.0)},
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the timer daemon with many concurrent sessions.")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
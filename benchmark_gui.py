@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+from statistics import median
+from time import perf_counter_ns
+
+HOUR = 60*60*1000
+SLIDER_RANGE = (1, 90)
+HANDLE_FRAMES = 12  # frames of the 200 ms handle animation at 60 Hz
+PULSE_FRAMES = 21  # frames of the 350 ms pulse animation at 60 Hz
+
+
+def measure(call, calls, repeat, warmup):
+    """Steady-state nanoseconds per call: the median and best of `repeat` batches of `calls`."""
+    for _ in range(warmup):
+        call()
+    samples = []
+    for _ in range(repeat):
+        started = perf_counter_ns()
+        for _ in range(calls):
+            call()
+        samples.append((perf_counter_ns() - started) / calls)
+    return {"calls": calls, "repeat": repeat, "median_ns": round(median(samples)), "min_ns": round(min(samples))}
+
+
+def run(args):
+    # imported only now, so the offscreen platform and the throwaway HOME are in place first
+    from PySide2 import __version__ as pyside_version
+    from PySide2.QtCore import QEasingCurve
+    from PySide2.QtWidgets import QApplication
+    from pomodorocore import MINUTES
+    from pomodorotimer import PomodoroTimer
+    from lcdnumberslider import LCDNumberSlider
+    from animated_toggle import AnimatedToggle
+    from stopwatch import ManualClock
+
+    app = QApplication([])
+    clock = ManualClock()
+    window = PomodoroTimer(width=600, height=400, clock=clock)
+    while not window.secondary_ui_ready:
+        app.processEvents()
+    core = window.core
+    results = {}
+
+    def bench(name, call, calls=args.calls, warmup=args.warmup):
+        results[name] = measure(call, calls, args.repeat, warmup)
+
+    # the countdown must not run out while the running branch is measured
+    core.set_time_limits(24*HOUR, core.short_break_state.time_limit)
+    window.handle_start()
+
+    def pomodoro_tick():
+        clock.advance(1000)
+        window.timer_fired()
+    bench("timer_fired.pomodoro", pomodoro_tick)
+
+    for name in ("calculate_display_time", "calculate_total_pomodoro_count", "calculate_last_task_time",
+                 "calculate_all_tasks_time", "calculate_pomodoro_tasks_time", "calculate_non_pomodoro_tasks_time",
+                 "calculate_non_pomodoro_minutes"):
+        bench(f"core.{name}", getattr(core, name))
+    bench("PomodoroTimer.calculate_hhmmss", PomodoroTimer.calculate_hhmmss)
+
+    core.set_time_limits(core.state.current_time, core.short_break_state.time_limit)
+
+    def expired_tick():
+        clock.advance(500)
+        window.timer_fired()
+    bench("timer_fired.expired", expired_tick)
+
+    window.handle_stop()
+    window.handle_non_pomodoro_start()
+
+    def non_pomodoro_tick():
+        clock.advance(MINUTES)
+        window.timer_fired()
+    bench("timer_fired.non_pomodoro", non_pomodoro_tick)
+    window.handle_non_pomodoro_stop()
+    window.handle_start()
+    window.handle_stop()
+
+    # handlers write to the journal and history, so a cycle costs far more than a tick
+    def start_stop_cycle():
+        window.handle_start()
+        clock.advance(25*MINUTES)
+        window.handle_stop()
+        window.handle_start()
+        clock.advance(5*MINUTES)
+        window.handle_stop()
+    bench("handlers.start_stop_cycle", start_stop_cycle, calls=max(1, args.calls // 10), warmup=1)
+
+    def skip_cycle():
+        window.handle_skip()
+        window.handle_skip()
+    bench("handlers.skip_cycle", skip_cycle, calls=max(1, args.calls // 10), warmup=1)
+
+    slider = LCDNumberSlider(minval=SLIDER_RANGE[0], maxval=SLIDER_RANGE[1], startval=SLIDER_RANGE[0], numdigits=2,
+                             background="#7bb661", color="black")
+    sweep = list(range(SLIDER_RANGE[0], SLIDER_RANGE[1] + 1)) + list(range(SLIDER_RANGE[1] - 1, SLIDER_RANGE[0], -1))
+    sweep_index = [0]
+
+    def slider_step():
+        # setValue fires valueChanged, which drives display_slider_value_in_lcd
+        sweep_index[0] = (sweep_index[0] + 1) % len(sweep)
+        slider.slider.setValue(sweep[sweep_index[0]])
+    bench("LCDNumberSlider.sweep_step", slider_step)
+    bench("LCDNumberSlider.display_slider_value_in_lcd", slider.display_slider_value_in_lcd)
+
+    toggle = AnimatedToggle()
+    toggle.setFixedSize(toggle.sizeHint())
+    toggle.show()
+    app.processEvents()
+    easing = QEasingCurve(QEasingCurve.InOutCubic)
+    handle_positions = [easing.valueForProgress(frame / HANDLE_FRAMES) for frame in range(HANDLE_FRAMES + 1)]
+    pulse_radii = [10 + 10*frame / PULSE_FRAMES for frame in range(PULSE_FRAMES + 1)]
+
+    def animate(checked):
+        # the frames the animations would paint, driven by hand so every one is painted synchronously
+        toggle.setChecked(checked)
+        toggle.animations_group.stop()
+        for handle_position in handle_positions if checked else reversed(handle_positions):
+            toggle.handle_position = handle_position
+            toggle.repaint()
+        toggle.pulse_anim.start()
+        for radius in pulse_radii:
+            toggle.pulse_radius = radius
+            toggle.repaint()
+        toggle.pulse_anim.stop()
+
+    def full_animation():
+        animate(True)
+        animate(False)
+
+    def cold_animation():
+        AnimatedToggle._frame_cache.clear()
+        full_animation()
+
+    frames = 2*(len(handle_positions) + len(pulse_radii))
+    animation_calls = max(1, args.calls // 20)
+    bench("AnimatedToggle.full_animation.cold", cold_animation, calls=animation_calls, warmup=1)
+    bench("AnimatedToggle.full_animation.warm", full_animation, calls=animation_calls, warmup=1)
+    for name in ("AnimatedToggle.full_animation.cold", "AnimatedToggle.full_animation.warm"):
+        results[name]["frames"] = frames
+        results[name]["median_ns_per_frame"] = round(results[name]["median_ns"] / frames)
+
+    report = {
+        "benchmark": "gui",
+        "platform": app.platformName(),
+        "python": platform.python_version(),
+        "pyside2": pyside_version,
+        "display_suspended": window.display_suspended,
+        "display_cache": window.display_cache.stats(),
+        "audio": {"available": window.audio.available, "last_error": window.audio.last_error},
+        "results": results,
+    }
+    window.close()
+    toggle.close()
+    slider.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure steady-state cost of the GUI hot paths offscreen.")
+    parser.add_argument("--calls", type=int, default=1000, help="calls per batch for the cheap paths")
+    parser.add_argument("--repeat", type=int, default=5, help="batches per path")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        # a throwaway HOME keeps the journal, history and settings of the real user untouched
+        os.environ.update(HOME=home, XDG_CONFIG_HOME=os.path.join(home, ".config"))
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        report = run(args)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(text + "\n")
+
+
+if __name__ == '__main__':
+    main()
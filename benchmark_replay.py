@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from journal import Journal, PROGRESS, read_records
+from pomodorocore import PomodoroCore, MINUTES, BLINK_INTERVAL
+from replay import Replay, Restart, NO_TOTALS
+from stopwatch import ManualClock, NANOSECONDS_PER_MILLISECOND
+
+SECONDS = 1000
+
+
+class SimulatedApp:
+    """A PomodoroCore driven the way the widget drives it, with the window hidden.
+
+    It wakes up when core.next_change_in() says so, ticks the countdown and
+    journals progress whenever the total minutes change, like timer_fired().
+    """
+
+    def __init__(self, journal, clock, totals, pomodoro_minutes):
+        self.journal = journal
+        self.clock = clock
+        self.core = PomodoroCore(pomodoro_time=pomodoro_minutes*MINUTES, clock=clock)
+        self.core.restore(totals)
+        self.core.subscribe(journal.record)
+        self.core.subscribe(self.remember)
+        self.last_totals = totals
+        self.total_minutes = self.core.calculate_all_tasks_time()
+
+    def remember(self, event, core):
+        # what the journal last saw, which is what the app is seeded from after a crash
+        self.last_totals = core.totals()
+
+    def wait(self, milliseconds):
+        until = self.clock.now + milliseconds*NANOSECONDS_PER_MILLISECOND
+        core = self.core
+        while core.state.started or core.state.non_pomodoro_started:
+            delay = core.next_change_in(seconds_shown=False)
+            if self.clock.now + delay*NANOSECONDS_PER_MILLISECOND > until:
+                break
+            self.clock.advance(delay)
+            if not core.state.non_pomodoro_started:
+                core.tick()
+            total_minutes = core.calculate_all_tasks_time()
+            if total_minutes != self.total_minutes:
+                self.total_minutes = total_minutes
+                self.journal.record(PROGRESS, core)
+                self.last_totals = core.totals()
+        self.clock.now = until
+
+    def wait_past_limit(self, rng):
+        """Let the countdown run out, then blink for a while before it is stopped."""
+        state = self.core.state
+        self.wait(max(0, state.time_limit - state.current_time) + rng.randrange(BLINK_INTERVAL, 3*MINUTES))
+
+    def non_pomodoro_block(self, rng):
+        self.core.non_pomodoro_start()
+        self.wait(rng.randrange(2*MINUTES, 40*MINUTES))
+        self.core.non_pomodoro_stop()
+
+
+def simulate_day(journal, clock, rng):
+    app = SimulatedApp(journal, clock, NO_TOTALS, rng.choice((25, 30, 30, 30)))
+    for _ in range(rng.randrange(8, 15)):
+        if rng.random() < 0.2:
+            app.non_pomodoro_block(rng)
+            app.wait(rng.randrange(MINUTES))
+        core = app.core
+        core.start()
+        if rng.random() < 0.5:
+            app.wait(rng.randrange(MINUTES, 15*MINUTES))
+        if core.can_pause_resume() and rng.random() < 0.3:
+            core.pause_resume()
+            if rng.random() < 0.5:
+                app.non_pomodoro_block(rng)
+            else:
+                app.wait(rng.randrange(10*SECONDS, 5*MINUTES))
+            if rng.random() < 0.05:
+                # a shorter limit while paused; the pomodoro runs out as soon as it resumes
+                core.set_time_limits(rng.choice((5, 10))*MINUTES, core.short_break_state.time_limit)
+            core.pause_resume()
+        if rng.random() < 0.03:
+            app.wait(rng.randrange(MINUTES, 5*MINUTES))
+            core.set_time_limits(rng.choice((20, 35))*MINUTES, core.short_break_state.time_limit)
+        if rng.random() < 0.01:
+            # the app crashes mid-pomodoro and is started again
+            app.wait(rng.randrange(MINUTES, 10*MINUTES))
+            app = SimulatedApp(journal, clock, app.last_totals, core.pomodoro_state.time_limit // MINUTES)
+            app.wait(rng.randrange(10*SECONDS, MINUTES))
+            continue
+        if rng.random() < 0.2:
+            app.wait(rng.randrange(5*MINUTES, 20*MINUTES))
+        else:
+            app.wait_past_limit(rng)
+        core.stop()
+        app.wait(rng.randrange(5*SECONDS, MINUTES))
+        if rng.random() < 0.1:
+            core.skip()
+        else:
+            core.start()
+            app.wait_past_limit(rng)
+            core.stop()
+        app.wait(rng.randrange(5*SECONDS, MINUTES))
+
+
+def generate(path, days, seed=0, noise=5):
+    """Write a journal of `days` simulated days starting a year ago; returns the number of records."""
+    rng = random.Random(seed)
+    clock = ManualClock()
+    first_day = date.today() - timedelta(days=days)
+    day_started_at = [0, 0]  # wall-clock and manual-clock milliseconds at the start of the current day
+
+    def wall_clock():
+        milliseconds = day_started_at[0] + clock.now // NANOSECONDS_PER_MILLISECOND - day_started_at[1]
+        return (milliseconds + rng.uniform(-noise, noise)) / 1000
+
+    journal = Journal(path, wall_clock=wall_clock)
+    for day in range(days):
+        morning = datetime.combine(first_day + timedelta(days=day), datetime.min.time()) + timedelta(hours=8)
+        day_started_at[:] = [int(morning.timestamp()*1000), clock.now // NANOSECONDS_PER_MILLISECOND]
+        simulate_day(journal, clock, rng)
+    journal.close()
+    return journal.seq
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a generated journal of simulated days.")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=5, help="milliseconds of wall-clock noise per record")
+    parser.add_argument("--journal", help="write the generated journal here and keep it")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.journal or os.path.join(directory, "journal.log")
+        started = perf_counter()
+        records = generate(path, args.days, args.seed, args.noise)
+        generated = perf_counter() - started
+
+        replay = Replay()
+        started = perf_counter()
+        mismatches = [mismatch for mismatch in map(replay.replay, read_records(path))
+                      if mismatch is not None and not isinstance(mismatch, Restart)]
+        elapsed = perf_counter() - started
+
+    assert not mismatches, mismatches[:5]
+    print(json.dumps({
+        "benchmark": "replay",
+        "days": args.days,
+        "records": records,
+        "generate_seconds": round(generated, 4),
+        "seconds": round(elapsed, 4),
+        "records_per_second": round(records / elapsed),
+        **replay.stats(),
+    }))
+
+
+if __name__ == '__main__':
+    main()
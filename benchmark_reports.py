@@ -0,0 +1,47 @@
+import argparse
+import json
+from time import perf_counter
+import numpy as np
+from pomodorocore import MINUTES
+from reports import Sessions, KIND_CODES, POMODORO_CODE, NON_POMODORO_CODE, build_report, DAY
+
+
+def synthetic_sessions(years, sessions_per_day, seed):
+    """Sorted sessions spread over working hours of every day, mostly pomodoros."""
+    rng = np.random.default_rng(seed)
+    days = int(years*365)
+    count = days*sessions_per_day
+    start = 1600000000000 // DAY*DAY
+    ended_at = np.sort(start + rng.integers(0, days, count)*DAY + rng.integers(7*60, 20*60, count)*MINUTES)
+    kind = rng.choice(np.array([POMODORO_CODE, NON_POMODORO_CODE, KIND_CODES["short_break"]], dtype=np.int8),
+                      size=count, p=[0.55, 0.15, 0.30])
+    duration = rng.integers(1, 40, count)*MINUTES
+    interruptions = rng.poisson(0.4, count).astype(np.int32)
+    return Sessions(kind, ended_at, duration, interruptions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time report generation over synthetic multi-year histories.")
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--sessions-per-day", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sessions = synthetic_sessions(args.years, args.sessions_per_day, args.seed)
+    results = {}
+    for processes in sorted({1, args.processes}):
+        started = perf_counter()
+        report = build_report(sessions, processes=processes)
+        results[f"processes_{processes}"] = round(perf_counter() - started, 4)
+
+    print(json.dumps({
+        "benchmark": "reports",
+        "sessions": len(sessions.ended_at),
+        "days": len(report.pomodoro_count),
+        "seconds": results,
+    }))
+
+
+if __name__ == '__main__':
+    main()
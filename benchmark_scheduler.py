@@ -0,0 +1,89 @@
+import argparse
+import json
+import random
+from time import perf_counter
+from pomodorocore import PomodoroCore, POMODORO_TIME, SHORT_BREAK_TIME
+from scheduler import DeadlineScheduler
+from stopwatch import ManualClock, NANOSECONDS_PER_MILLISECOND
+
+TICK_INTERVAL = 500  # milliseconds, the fixed cadence every session used to poll at
+
+
+def start_sessions(clock, sessions, seed):
+    rng = random.Random(seed)
+    cores = []
+    for _ in range(sessions):
+        core = PomodoroCore(pomodoro_time=rng.randrange(POMODORO_TIME // 2, POMODORO_TIME),
+                            short_break_time=SHORT_BREAK_TIME, clock=clock)
+        core.start()
+        cores.append(core)
+    return cores
+
+
+def tick_every_session(sessions, horizon, seed):
+    """One timer per session, each polling every TICK_INTERVAL until horizon."""
+    clock = ManualClock()
+    cores = start_sessions(clock, sessions, seed)
+    expiries = 0
+    for _ in range(horizon // TICK_INTERVAL):
+        clock.advance(TICK_INTERVAL)
+        for core in cores:
+            announced = core.expiry_announced
+            if core.tick() and not announced:
+                expiries += 1
+    return expiries
+
+
+def heap_scheduler(sessions, horizon, seed):
+    """Only due expiries fire; each is a heap pop."""
+    clock = ManualClock()
+    cores = start_sessions(clock, sessions, seed)
+    scheduler = DeadlineScheduler()
+    expiries = 0
+
+    def expire(index):
+        nonlocal expiries
+        if cores[index].tick():
+            expiries += 1
+
+    for index, core in enumerate(cores):
+        remaining = core.state.time_limit - core.state.current_time
+        scheduler.schedule(index, clock() + remaining*NANOSECONDS_PER_MILLISECOND, expire)
+    end = horizon*NANOSECONDS_PER_MILLISECOND
+    while True:
+        deadline = scheduler.next_deadline()
+        if deadline is None or deadline > end:
+            break
+        clock.now = deadline
+        scheduler.run_due(deadline)
+    return expiries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-session polling with a shared deadline heap.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--minutes", type=int, default=30, help="simulated time span")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    horizon = args.minutes*60*1000
+
+    results = {}
+    expiries = {}
+    for name, approach in (("tick_per_session", tick_every_session), ("heap_scheduler", heap_scheduler)):
+        started = perf_counter()
+        expiries[name] = approach(args.sessions, horizon, args.seed)
+        results[name] = round(perf_counter() - started, 4)
+    assert expiries["tick_per_session"] == expiries["heap_scheduler"], expiries
+
+    print(json.dumps({
+        "benchmark": "scheduler",
+        "sessions": args.sessions,
+        "simulated_minutes": args.minutes,
+        "seconds": results,
+        "expiries": expiries["heap_scheduler"],
+        "speedup": round(results["tick_per_session"] / results["heap_scheduler"], 1),
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in a fresh interpreter: builds the window offscreen and reports, relative to
+# the moment the process was launched, when imports finished, when the first frame was painted and
+# when the deferred panels were ready.
+PROBE = """
+import json, sys, time
+started = float(sys.argv[1])
+from PySide2.QtCore import QEvent, QObject, QTimer
+from PySide2.QtWidgets import QApplication
+import pomodorotimer
+imported = time.time()
+app = QApplication([])
+marks = {}
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and "first_frame" not in marks:
+            marks["first_frame"] = time.time()
+        return False
+
+def poll():
+    if window.secondary_ui_ready:
+        marks["secondary_ui"] = time.time()
+        app.quit()
+    else:
+        QTimer.singleShot(1, poll)
+
+first_paint = FirstPaint()
+app.installEventFilter(first_paint)
+window = pomodorotimer.PomodoroTimer(width=600, height=400)
+QTimer.singleShot(0, poll)
+app.exec_()
+window.close()
+print(json.dumps({
+    "imports_ms": (imported - started) * 1000,
+    "first_frame_ms": (marks["first_frame"] - started) * 1000,
+    "secondary_ui_ms": (marks["secondary_ui"] - started) * 1000,
+}))
+"""
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def probe_environment(home):
+    # a throwaway HOME keeps the journal and history of the real user untouched
+    return dict(os.environ, QT_QPA_PLATFORM="offscreen", HOME=home)
+
+
+def measure_startup(home):
+    output = subprocess.run([sys.executable, "-c", PROBE, repr(time.time())], cwd=HERE,
+                            env=probe_environment(home), capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_breakdown(home, top=15):
+    """Cumulative import time of pomodorotimer and of each module it imports directly, in ms.
+
+    -X importtime prints a module after everything it imported, indented two
+    spaces per level, so the direct imports are the depth-1 lines just before it.
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import pomodorotimer"], cwd=HERE,
+                            env=probe_environment(home), capture_output=True, text=True, check=True).stderr
+    children = {}
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        depth = (len(match.group(3)) - 1) // 2
+        milliseconds = int(match.group(2)) / 1000
+        if depth == 1:
+            children[match.group(4)] = milliseconds
+        elif depth == 0:
+            if match.group(4) == "pomodorotimer":
+                top_children = sorted(children.items(), key=lambda item: item[1], reverse=True)[:top]
+                return {"pomodorotimer": milliseconds, **dict(top_children)}
+            children = {}
+    return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-frame of the pomodoro timer.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        runs = [measure_startup(home) for _ in range(args.runs)]
+        breakdown = import_breakdown(home)
+
+    print(json.dumps({
+        "benchmark": "startup",
+        "runs": args.runs,
+        "median": {key: round(median(run[key] for run in runs), 2) for key in runs[0]},
+        "import_breakdown_ms": breakdown,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import json
+import socket
+from collections import Counter
+from time import monotonic_ns
+from pomodorocore import (PomodoroCore, Totals, STARTED, PAUSED, RESUMED, STOPPED, SKIPPED, NON_POMODORO_STARTED,
+                          NON_POMODORO_STOPPED)
+from timerdaemon import DEFAULT_SOCKET_PATH
+import statemachine
+
+# event another client caused -> (guard, action) replaying it on the mirror; expiries are ticked into locally
+REPLAYED = {
+    STARTED: (PomodoroCore.can_start, PomodoroCore.start),
+    PAUSED: (lambda core: core.can_pause_resume() and not core.state.paused, PomodoroCore.pause_resume),
+    RESUMED: (lambda core: core.state.paused, PomodoroCore.pause_resume),
+    STOPPED: (PomodoroCore.can_stop, PomodoroCore.stop),
+    SKIPPED: (PomodoroCore.can_start, PomodoroCore.skip),
+    NON_POMODORO_STARTED: (PomodoroCore.can_non_pomodoro_start, PomodoroCore.non_pomodoro_start),
+    NON_POMODORO_STOPPED: (PomodoroCore.can_non_pomodoro_stop, PomodoroCore.non_pomodoro_stop),
+}
+PHASES = {"pomodoro": statemachine.POMODORO, "short_break": statemachine.SHORT_BREAK,
+          "long_break": statemachine.LONG_BREAK}
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonCore(PomodoroCore):
+    """PomodoroCore mirroring one session of a TimerDaemon, so a front end can be one of its clients.
+
+    Each action goes to the daemon first and, once the daemon has taken it,
+    runs on this core too, so listeners here see the same events, with the
+    core in the same state, as with a local core. Actions of other clients
+    reach this core through a "watch" connection: read_events() replays them
+    when that socket becomes readable, then calls each follower with the
+    event. Expiries are not replayed; this core ticks into them like a local one.
+
+    An action the daemon refuses, because another client got there first,
+    brings the mirror back to the session's status and tells the followers
+    with event None. If the daemon goes away, the core carries on locally
+    and keeps the reason in last_error.
+    """
+
+    def __init__(self, session, socket_path=DEFAULT_SOCKET_PATH, clock=monotonic_ns):
+        super().__init__(clock=clock)
+        self.session = session
+        self.followers = []
+        self.last_error = None
+        self.requests = 0
+        # events of this core's own actions, which come back once more through the watch
+        self.own_events = Counter()
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(socket_path)
+        self.responses = self.connection.makefile("rb")
+        self.watch = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.watch.connect(socket_path)
+        self.watch.sendall(b'{"command": "watch"}\n')
+        self.watch_buffer = b""
+        while b"\n" not in self.watch_buffer:
+            data = self.watch.recv(4096)
+            if not data:
+                raise ConnectionError("the daemon closed the connection")
+            self.watch_buffer += data
+        # the acknowledgement; events come after it
+        self.watch_buffer = self.watch_buffer.split(b"\n", 1)[1]
+        self.watch.setblocking(False)
+        self.apply_status(self.request("status"))
+
+    @property
+    def connected(self):
+        return self.watch is not None
+
+    def request(self, command, **fields):
+        self.requests += 1
+        message = {"id": self.requests, "session": self.session, "command": command, **fields}
+        self.connection.sendall((json.dumps(message) + "\n").encode())
+        line = self.responses.readline()
+        if not line:
+            raise ConnectionError("the daemon closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise DaemonError(response["error"])
+        return response["result"]
+
+    def apply_status(self, status):
+        """Set this core to the session as the daemon reports it, e.g. when connecting in the middle of a block."""
+        self.stop_countdown()
+        self.last_non_pomodoro_stopwatch.stop()
+        self.all_non_pomodoro_stopwatch.stop()
+        totals = Totals(**status["totals"])
+        self.restore(totals)
+        self.last_non_pomodoro_time = totals.last_non_pomodoro_time
+        # a snapshot has no history to replay, so the phase is set directly, as replay.py relocates a core
+        self.phase = PHASES[status["state"]]
+        for state in (self.pomodoro_state, self.short_break_state, self.long_break_state):
+            state.started = state.paused = state.non_pomodoro_started = False
+        self.state = self.countdowns[self.phase]
+        self.state.started = status["started"]
+        self.state.paused = status["paused"]
+        self.state.non_pomodoro_started = status["non_pomodoro_started"]
+        self.state.time_limit = status["time_limit"]
+        self.state.current_time = status["current_time"]
+        self.state.show_blink = True
+        self.expiry_announced = self.state.started and status["expired"]
+        if self.in_pomodoro and self.state.paused:
+            self.phase = statemachine.PAUSED
+        elif self.in_pomodoro and self.expiry_announced:
+            self.phase = statemachine.BLINKING
+        if self.state.started and not self.state.paused:
+            self.resume_countdown()
+        if self.state.non_pomodoro_started:
+            self.last_non_pomodoro_stopwatch.start()
+            self.all_non_pomodoro_stopwatch.start()
+
+    def send(self, command, event):
+        """Whether to go ahead with an action here: the daemon took it, or there is no daemon any more."""
+        if not self.connected:
+            return True
+        try:
+            self.request(command)
+        except DaemonError as error:
+            self.last_error = str(error)
+            self.resync()
+            return False
+        except (OSError, ValueError) as error:
+            self.disconnect(error)
+            return True
+        self.own_events[event] += 1
+        return True
+
+    def resync(self):
+        try:
+            self.apply_status(self.request("status"))
+        except (OSError, ValueError, DaemonError) as error:
+            self.disconnect(error)
+        self.tell_followers(None)
+
+    def disconnect(self, error):
+        self.last_error = str(error) or type(error).__name__
+        self.close()
+
+    def close(self):
+        if self.connected:
+            self.responses.close()
+            self.connection.close()
+            self.watch.close()
+            self.watch = None
+
+    def tell_followers(self, event):
+        for follower in self.followers:
+            follower(event)
+
+    def read_events(self):
+        """Replay what other clients did to the session since the last call."""
+        if not self.connected:
+            return
+        try:
+            while True:
+                data = self.watch.recv(65536)
+                if not data:
+                    raise ConnectionError("the daemon closed the connection")
+                self.watch_buffer += data
+        except BlockingIOError:
+            pass
+        except OSError as error:
+            self.disconnect(error)
+        *lines, self.watch_buffer = self.watch_buffer.split(b"\n")
+        for line in lines:
+            message = json.loads(line)
+            if message["session"] == self.session:
+                self.replay(message["event"])
+
+    def replay(self, event):
+        if self.own_events[event]:
+            self.own_events[event] -= 1
+            return
+        if event not in REPLAYED:
+            return
+        guard, action = REPLAYED[event]
+        if not guard(self):
+            # this core missed something; the daemon knows best
+            self.resync()
+            return
+        action(self)
+        self.tell_followers(event)
+
+    def set_time_limits(self, pomodoro_time, short_break_time, long_break_time=None):
+        super().set_time_limits(pomodoro_time, short_break_time, long_break_time)
+        if self.connected:
+            try:
+                self.request("set_time_limits", pomodoro_time=self.pomodoro_state.time_limit,
+                             short_break_time=self.short_break_state.time_limit,
+                             long_break_time=self.long_break_state.time_limit)
+            except DaemonError as error:
+                self.last_error = str(error)
+            except (OSError, ValueError) as error:
+                self.disconnect(error)
+
+    def start(self):
+        self.read_events()
+        if self.send("start", STARTED):
+            super().start()
+
+    def stop(self):
+        self.read_events()
+        if self.send("stop", STOPPED):
+            super().stop()
+
+    def skip(self):
+        self.read_events()
+        if self.send("skip", SKIPPED):
+            super().skip()
+
+    def pause_resume(self):
+        self.read_events()
+        if self.send("pause_resume", RESUMED if self.state.paused else PAUSED):
+            super().pause_resume()
+
+    def non_pomodoro_start(self):
+        self.read_events()
+        if self.send("non_pomodoro_start", NON_POMODORO_STARTED):
+            super().non_pomodoro_start()
+
+    def non_pomodoro_stop(self):
+        self.read_events()
+        if self.send("non_pomodoro_stop", NON_POMODORO_STOPPED):
+            super().non_pomodoro_stop()
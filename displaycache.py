@@ -0,0 +1,64 @@
+class DisplayCache:
+    """Remembers the last text pushed to each widget and skips unchanged updates.
+
+    Every write to a widget managed by the cache must go through it, otherwise
+    the cached text goes stale and a needed update could be skipped.
+
+    While suspended, updates are only remembered, the last one per widget,
+    and resume() pushes them. update() reports changes the same either way.
+    """
+
+    def __init__(self):
+        self.rendered = {}
+        self.pending = {}
+        self.suspended = False
+        self.pushed = 0
+        self.skipped = 0
+        self.deferred = 0
+
+    def update(self, key, text, setter):
+        if self.suspended:
+            return self.defer(key, text, setter)
+        if self.rendered.get(key) == text:
+            self.skipped += 1
+            return False
+        self.rendered[key] = text
+        setter(text)
+        self.pushed += 1
+        return True
+
+    def defer(self, key, text, setter):
+        pending = self.pending.get(key)
+        if (self.rendered.get(key) if pending is None else pending[0]) == text:
+            self.skipped += 1
+            return False
+        self.pending[key] = (text, setter)
+        self.deferred += 1
+        return True
+
+    def suspend(self):
+        self.suspended = True
+
+    def resume(self):
+        self.suspended = False
+        pending, self.pending = self.pending, {}
+        for key, (text, setter) in pending.items():
+            self.update(key, text, setter)
+
+    def display(self, lcd, text):
+        return self.update(lcd, text, lcd.display)
+
+    def set_text(self, label, text):
+        return self.update(label, text, label.setText)
+
+    def set_window_title(self, window, title):
+        return self.update(window, title, window.setWindowTitle)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.rendered.clear()
+        else:
+            self.rendered.pop(key, None)
+
+    def stats(self):
+        return {"pushed": self.pushed, "skipped": self.skipped, "deferred": self.deferred}
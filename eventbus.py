@@ -0,0 +1,172 @@
+import json
+import os
+import queue
+import subprocess
+import threading
+from time import monotonic, time
+
+DEFAULT_HOOKS_PATH = os.path.join(os.path.expanduser("~"), ".pypomodoro", "hooks.json")
+MAX_PENDING = 256  # events waiting for a worker before new ones are dropped
+WORKER_COUNT = 2
+HOOK_TIMEOUT = 10  # seconds a single command or request may take
+CLOSE_TIMEOUT = 1  # seconds close() waits in total for the workers
+
+
+def event_payload(event, core):
+    return {
+        "event": event,
+        "state": core.state.name,
+        "time": int(time()*1000),
+        "totals": core.totals()._asdict(),
+    }
+
+
+class EventBus:
+    """Delivers core events to slow subscribers on worker threads.
+
+    record() is a core listener that only copies the event into a bounded
+    queue and returns, so the thread that runs the timer never waits for a
+    subscriber. When the queue is full the new event is dropped and counted
+    instead of blocking. With several workers, events can reach subscribers
+    out of order.
+    """
+
+    def __init__(self, workers=WORKER_COUNT, max_pending=MAX_PENDING):
+        self.subscribers = {}
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        self.last_error = None
+        self.workers = [threading.Thread(target=self.work, name=f"event-bus-{number}", daemon=True)
+                        for number in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def subscribe(self, event, subscriber):
+        """Call subscriber(payload) on a worker thread for every published event of that name."""
+        self.subscribers.setdefault(event, []).append(subscriber)
+
+    def record(self, event, core):
+        """Core listener: publish the event with a snapshot of the core taken now."""
+        if event in self.subscribers:
+            self.publish(event, event_payload(event, core))
+
+    def publish(self, event, payload):
+        try:
+            self.queue.put_nowait((event, payload))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.published += 1
+        return True
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            event, payload = item
+            for subscriber in self.subscribers.get(event, ()):
+                try:
+                    subscriber(payload)
+                except Exception as error:
+                    with self.lock:
+                        self.failed += 1
+                        self.last_error = f"{event}: {error!r}"
+                else:
+                    with self.lock:
+                        self.delivered += 1
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "dropped": self.dropped,
+            "pending": self.queue.qsize(),
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "last_error": self.last_error,
+        }
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Stop the workers after the queued events, waiting at most timeout seconds in total.
+
+        Workers still busy in a hook by then are left behind; as daemon threads
+        they end with the app. Returns whether all of them finished.
+        """
+        deadline = monotonic() + timeout
+        for _ in self.workers:
+            while True:
+                try:
+                    self.queue.put_nowait(None)
+                    break
+                except queue.Full:
+                    # the workers are behind: the oldest pending event makes room for the stop
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    self.dropped += 1
+        for worker in self.workers:
+            worker.join(max(0, deadline - monotonic()))
+        return not any(worker.is_alive() for worker in self.workers)
+
+
+def command_hook(command):
+    """Subscriber running command with the payload as JSON on its standard input."""
+    def run(payload):
+        subprocess.run(command, input=json.dumps(payload).encode(), timeout=HOOK_TIMEOUT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return run
+
+
+def http_hook(url):
+    """Subscriber POSTing the payload as JSON to url."""
+    # imported here, as it takes longer than starting the whole terminal front end
+    import urllib.request
+
+    def post(payload):
+        request = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=HOOK_TIMEOUT) as response:
+            response.read()
+    return post
+
+
+def load_hooks(bus, path=DEFAULT_HOOKS_PATH):
+    """Subscribe the hooks configured in a JSON file, if there is one; returns how many were subscribed.
+
+    The file maps core event names to lists of hooks, each either
+    {"command": [program, arguments...]} or {"url": "http://..."}, e.g.
+    {"start": [{"command": ["notify-send", "Pomodoro"]}], "expire": [{"url": "http://localhost:8000/"}]}
+    The hooks are optional, so a file that cannot be read and hooks that are
+    not understood are skipped; the last problem shows in bus.stats()["last_error"].
+    """
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as hooks_file:
+            hooks = json.load(hooks_file)
+    except (OSError, ValueError) as error:
+        bus.last_error = f"{path}: {error}"
+        return 0
+    if not isinstance(hooks, dict):
+        bus.last_error = f"{path}: expected an object mapping event names to lists of hooks"
+        return 0
+    count = 0
+    for event, event_hooks in hooks.items():
+        if not isinstance(event_hooks, list):
+            bus.last_error = f"{path}: hooks for {event} must be a list"
+            continue
+        for hook in event_hooks:
+            if isinstance(hook, dict) and "command" in hook:
+                bus.subscribe(event, command_hook(hook["command"]))
+            elif isinstance(hook, dict) and "url" in hook:
+                bus.subscribe(event, http_hook(hook["url"]))
+            else:
+                bus.last_error = f"{path}: hook for {event} needs a command or a url: {hook}"
+                continue
+            count += 1
+    return count
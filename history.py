@@ -0,0 +1,324 @@
+import os
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from time import time
+from pomodorocore import (MINUTES, STARTED, STOPPED, SKIPPED, NON_POMODORO_STARTED, NON_POMODORO_STOPPED,
+                          Totals)
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".pypomodoro", "history.sqlite3")
+POMODORO = "pomodoro"
+NON_POMODORO = "non_pomodoro"
+LOCAL_DEVICE = ""  # sessions recorded on this machine; merged ones carry the id of their device
+
+RollupTotals = namedtuple("RollupTotals", "pomodoro_count pomodoro_time non_pomodoro_time interruption_count")
+TaskTotals = namedtuple("TaskTotals", "pomodoro_count pomodoro_time non_pomodoro_time")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at INTEGER NOT NULL,
+    ended_at INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    interruptions INTEGER NOT NULL DEFAULT 0,
+    device TEXT NOT NULL DEFAULT '',
+    task TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS sessions_started_at ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_ended_at ON sessions (ended_at);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    day TEXT PRIMARY KEY,
+    pomodoro_count INTEGER NOT NULL DEFAULT 0,
+    pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    non_pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    interruption_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS weekly_rollups (
+    week TEXT PRIMARY KEY,
+    pomodoro_count INTEGER NOT NULL DEFAULT 0,
+    pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    non_pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    interruption_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS task_rollups (
+    task TEXT NOT NULL,
+    period TEXT NOT NULL,  -- a day_key() or a week_key()
+    pomodoro_count INTEGER NOT NULL DEFAULT 0,
+    pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    non_pomodoro_time INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (task, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tasks (
+    name TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS interruptions (
+    pomodoro_started_at INTEGER NOT NULL,
+    started_at INTEGER NOT NULL,
+    ended_at INTEGER NOT NULL,
+    reason TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (pomodoro_started_at, started_at)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    device TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# columns added to sessions since it was first released, given to older histories on open
+ADDED_COLUMNS = {
+    "device": "device TEXT NOT NULL DEFAULT ''",
+    "task": "task TEXT NOT NULL DEFAULT ''",
+}
+
+# run once the added columns exist
+INDEXES = """
+CREATE INDEX IF NOT EXISTS sessions_device ON sessions (device, started_at);
+CREATE INDEX IF NOT EXISTS sessions_device_ended_at ON sessions (device, ended_at);
+"""
+
+INSERT_SESSION = """
+INSERT INTO sessions (kind, started_at, ended_at, duration, interruptions, task, device)
+SELECT ?, ?, ?, ?, ?, ?, ?
+WHERE NOT EXISTS (SELECT 1 FROM sessions WHERE device = ? AND started_at = ? AND kind = ?)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO {table} ({key}, pomodoro_count, pomodoro_time, non_pomodoro_time, interruption_count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT ({key}) DO UPDATE SET
+    pomodoro_count = pomodoro_count + excluded.pomodoro_count,
+    pomodoro_time = pomodoro_time + excluded.pomodoro_time,
+    non_pomodoro_time = non_pomodoro_time + excluded.non_pomodoro_time,
+    interruption_count = interruption_count + excluded.interruption_count
+"""
+
+UPSERT_TASK_ROLLUP = """
+INSERT INTO task_rollups (task, period, pomodoro_count, pomodoro_time, non_pomodoro_time)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (task, period) DO UPDATE SET
+    pomodoro_count = pomodoro_count + excluded.pomodoro_count,
+    pomodoro_time = pomodoro_time + excluded.pomodoro_time,
+    non_pomodoro_time = non_pomodoro_time + excluded.non_pomodoro_time
+"""
+
+INSERT_INTERRUPTION = """
+INSERT OR IGNORE INTO interruptions (pomodoro_started_at, started_at, ended_at, reason) VALUES (?, ?, ?, ?)
+"""
+
+UPSERT_TASK = """
+INSERT INTO tasks (name, sessions) VALUES (?, 1)
+ON CONFLICT (name) DO UPDATE SET sessions = sessions + 1
+"""
+
+
+def day_key(day):
+    return day.isoformat()
+
+
+def week_key(day):
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def rounded_minutes(milliseconds):
+    # the same snapping PomodoroCore applies to its running totals on stop
+    return MINUTES*round(milliseconds / MINUTES)
+
+
+def contribution(kind, duration, interruptions):
+    """What a session adds to a rollup: (pomodoro_count, pomodoro_time, non_pomodoro_time, interruption_count)."""
+    if kind == POMODORO:
+        return 1, rounded_minutes(duration), 0, interruptions
+    if kind == NON_POMODORO:
+        return 0, 0, rounded_minutes(duration), 0
+    return 0, 0, 0, 0
+
+
+def day_start(day):
+    """Wall-clock milliseconds at local midnight starting day."""
+    return int(datetime.combine(day, datetime.min.time()).timestamp()*1000)
+
+
+class History:
+    """Completed sessions in SQLite, with per-day and per-week rollups kept up to date on insert.
+
+    Totals for a day or a week are a single primary-key lookup, and a year of
+    days is at most 366 rollup rows, however many sessions were recorded.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, wall_clock=time):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.wall_clock = wall_clock
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        columns = {column[1] for column in self.connection.execute("PRAGMA table_info(sessions)")}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE sessions ADD COLUMN {definition}")
+        self.connection.executescript(INDEXES)
+        self.started_at = {}
+
+    def record(self, event, core):
+        """Core listener: store each block when it ends."""
+        now = int(self.wall_clock()*1000)
+        if event == STARTED:
+            self.started_at[core.state.name] = now
+        elif event == NON_POMODORO_STARTED:
+            self.started_at[NON_POMODORO] = now
+        elif event in (STOPPED, SKIPPED):
+            duration = core.last_task_time if core.in_pomodoro else core.state.current_time
+            interruptions = core.interruption_count if core.in_pomodoro else 0
+            task = core.task if core.in_pomodoro else ""
+            self.add_session(core.state.name, self.started_at.pop(core.state.name, now), now, duration,
+                             interruptions, task)
+        elif event == NON_POMODORO_STOPPED:
+            self.add_session(NON_POMODORO, self.started_at.pop(NON_POMODORO, now), now,
+                             core.last_non_pomodoro_time, task=core.non_pomodoro_task)
+
+    def add_session(self, kind, started_at, ended_at, duration, interruptions=0, task=""):
+        with self.connection:
+            self.insert_session(kind, started_at, ended_at, duration, interruptions, task, LOCAL_DEVICE)
+
+    def insert_session(self, kind, started_at, ended_at, duration, interruptions, task, device):
+        """Insert a session and its rollup contributions, unless the device already has it; the caller commits."""
+        totals = contribution(kind, duration, interruptions)
+        day = datetime.fromtimestamp(ended_at / 1000).date()
+        cursor = self.connection.execute(INSERT_SESSION, (kind, started_at, ended_at, duration, interruptions, task,
+                                                          device, device, started_at, kind))
+        if cursor.rowcount == 0:
+            return False
+        if any(totals):
+            self.connection.execute(UPSERT_ROLLUP.format(table="daily_rollups", key="day"),
+                                    (day_key(day),) + totals)
+            self.connection.execute(UPSERT_ROLLUP.format(table="weekly_rollups", key="week"),
+                                    (week_key(day),) + totals)
+            if task:
+                for period in (day_key(day), week_key(day)):
+                    self.connection.execute(UPSERT_TASK_ROLLUP, (task, period) + totals[:3])
+                self.connection.execute(UPSERT_TASK, (task,))
+        return True
+
+    def merge_sessions(self, device, sessions, position):
+        """Add another device's sessions and move its watermark in one transaction; returns how many were new.
+
+        Sessions the device already has here are skipped, so merging the same ones again changes nothing.
+        """
+        with self.connection:
+            merged = sum(self.insert_session(*session, device) for session in sessions)
+            self.set_watermark(device, position)
+        return merged
+
+    def local_sessions(self, after_id):
+        """Sessions recorded on this machine with an id above after_id, as (id, kind, started_at, ended_at,
+        duration, interruptions, task)."""
+        return self.connection.execute(
+            "SELECT id, kind, started_at, ended_at, duration, interruptions, task FROM sessions "
+            "WHERE device = ? AND id > ? ORDER BY id", (LOCAL_DEVICE, after_id)).fetchall()
+
+    def watermark(self, device):
+        row = self.connection.execute("SELECT position FROM sync_watermarks WHERE device = ?", (device,)).fetchone()
+        return row[0] if row else 0
+
+    def set_watermark(self, device, position):
+        self.connection.execute("INSERT INTO sync_watermarks (device, position) VALUES (?, ?) "
+                                "ON CONFLICT (device) DO UPDATE SET position = excluded.position", (device, position))
+
+    def day_totals(self, day=None):
+        day = date.today() if day is None else day
+        row = self.connection.execute(
+            "SELECT pomodoro_count, pomodoro_time, non_pomodoro_time, interruption_count "
+            "FROM daily_rollups WHERE day = ?", (day_key(day),)).fetchone()
+        return RollupTotals(*row) if row else RollupTotals(0, 0, 0, 0)
+
+    def week_totals(self, day=None):
+        day = date.today() if day is None else day
+        row = self.connection.execute(
+            "SELECT pomodoro_count, pomodoro_time, non_pomodoro_time, interruption_count "
+            "FROM weekly_rollups WHERE week = ?", (week_key(day),)).fetchone()
+        return RollupTotals(*row) if row else RollupTotals(0, 0, 0, 0)
+
+    def range_totals(self, first_day, last_day):
+        row = self.connection.execute(
+            "SELECT SUM(pomodoro_count), SUM(pomodoro_time), SUM(non_pomodoro_time), SUM(interruption_count) "
+            "FROM daily_rollups WHERE day BETWEEN ? AND ?", (day_key(first_day), day_key(last_day))).fetchone()
+        return RollupTotals(*(total or 0 for total in row))
+
+    def last_year_totals(self, day=None):
+        day = date.today() if day is None else day
+        return self.range_totals(day - timedelta(days=365), day)
+
+    def daily_rollups(self, first_day, last_day):
+        return [(date.fromisoformat(day), RollupTotals(*totals)) for day, *totals in self.connection.execute(
+            "SELECT day, pomodoro_count, pomodoro_time, non_pomodoro_time, interruption_count "
+            "FROM daily_rollups WHERE day BETWEEN ? AND ? ORDER BY day", (day_key(first_day), day_key(last_day)))]
+
+    def sessions(self, ended_from, ended_before):
+        """Raw sessions with ended_at (wall-clock milliseconds) in [ended_from, ended_before), as rollups count them."""
+        return self.connection.execute(
+            "SELECT kind, started_at, ended_at, duration, interruptions FROM sessions "
+            "WHERE ended_at >= ? AND ended_at < ? ORDER BY ended_at", (ended_from, ended_before)).fetchall()
+
+    def add_interruptions(self, pomodoro_started_at, interruptions):
+        """Store the (started_at, ended_at, reason) pauses of a pomodoro recorded on this machine."""
+        with self.connection:
+            self.connection.executemany(INSERT_INTERRUPTION, ((pomodoro_started_at, started_at, ended_at, reason or "")
+                                                              for started_at, ended_at, reason in interruptions))
+
+    def interruptions(self, started_from, started_before):
+        """Pauses of the pomodoros started in [started_from, started_before), as
+        (pomodoro_started_at, started_at, ended_at, reason) with a reason of None when none was given."""
+        return [(pomodoro_started_at, started_at, ended_at, reason or None)
+                for pomodoro_started_at, started_at, ended_at, reason in self.connection.execute(
+                    "SELECT pomodoro_started_at, started_at, ended_at, reason FROM interruptions "
+                    "WHERE pomodoro_started_at >= ? AND pomodoro_started_at < ? "
+                    "ORDER BY pomodoro_started_at, started_at",
+                    (started_from, started_before))]
+
+    def local_pomodoro_count(self, started_from, started_before):
+        """Pomodoros recorded on this machine that started in [started_from, started_before)."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM sessions WHERE device = ? AND started_at >= ? AND started_at < ? AND kind = ?",
+            (LOCAL_DEVICE, started_from, started_before, POMODORO)).fetchone()[0]
+
+    def task_totals(self, task, day=None):
+        """(day, week) TaskTotals of one task, each a single primary-key lookup."""
+        day = date.today() if day is None else day
+        return tuple(self.task_period_totals(task, period) for period in (day_key(day), week_key(day)))
+
+    def task_period_totals(self, task, period):
+        row = self.connection.execute(
+            "SELECT pomodoro_count, pomodoro_time, non_pomodoro_time FROM task_rollups WHERE task = ? AND period = ?",
+            (task, period)).fetchone()
+        return TaskTotals(*row) if row else TaskTotals(0, 0, 0)
+
+    def task_names(self):
+        """Every task name used so far, with the number of sessions recorded for it."""
+        return self.connection.execute("SELECT name, sessions FROM tasks").fetchall()
+
+    def today_totals(self):
+        """Today's sessions of this machine as core Totals, for seeding the counters at startup.
+
+        The rollups also hold sessions merged from other devices, which the
+        counters of this machine never include, so they are summed from the
+        local sessions that ended today instead.
+        """
+        today = date.today()
+        pomodoro_count = pomodoro_time = non_pomodoro_time = 0
+        for kind, duration, interruptions in self.connection.execute(
+                "SELECT kind, duration, interruptions FROM sessions "
+                "WHERE device = ? AND ended_at >= ? AND ended_at < ?",
+                (LOCAL_DEVICE, day_start(today), day_start(today + timedelta(days=1)))):
+            count, pomodoro, non_pomodoro, _ = contribution(kind, duration, interruptions)
+            pomodoro_count += count
+            pomodoro_time += pomodoro
+            non_pomodoro_time += non_pomodoro
+        return Totals(0, pomodoro_time, non_pomodoro_time, 0, pomodoro_count, 0)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,137 @@
+import functools
+import json
+import os
+from time import perf_counter_ns
+
+# Set to a file path to record hot-path metrics and dump them there when the timer closes.
+METRICS_ENV = "POMODORO_METRICS"
+BUCKET_COUNT = 32  # power-of-two microsecond buckets, up to ~35 minutes
+
+
+class Histogram:
+    """Counts values into power-of-two buckets; add() is a handful of integer operations."""
+
+    __slots__ = ("count", "total", "minimum", "maximum", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.buckets = [0]*BUCKET_COUNT
+
+    def add(self, value):
+        value = max(0, value)
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        self.buckets[min(value.bit_length(), BUCKET_COUNT - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values."""
+        if not self.count:
+            return None
+        rank = fraction*self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.maximum, (1 << bucket) - 1)
+        return self.maximum
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.minimum,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+            "buckets": {f"<{1 << bucket}": bucket_count
+                        for bucket, bucket_count in enumerate(self.buckets) if bucket_count},
+        }
+
+
+class Instrumentation:
+    """Opt-in registry of histograms (in microseconds) and counters.
+
+    timed() decides at decoration time: when disabled it returns the function
+    untouched, so instrumented hot paths cost nothing unless METRICS_ENV was
+    set before the modules were imported.
+    """
+
+    def __init__(self, enabled=False, dump_path=None):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.histograms = {}
+        self.counters = {}
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name, microseconds):
+        self.histogram(name).add(microseconds)
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timed(self, name):
+        def decorate(function):
+            if not self.enabled:
+                return function
+            histogram = self.histogram(name)
+            # Qt hands signal arguments to slots that accept them, so a slot taking only
+            # self must stay that way, or clicked() would pass `checked` through.
+            if function.__code__.co_argcount == 1:
+                @functools.wraps(function)
+                def wrapper(instance):
+                    started = perf_counter_ns()
+                    try:
+                        return function(instance)
+                    finally:
+                        histogram.add((perf_counter_ns() - started) // 1000)
+            else:
+                @functools.wraps(function)
+                def wrapper(instance, *args):
+                    started = perf_counter_ns()
+                    try:
+                        return function(instance, *args)
+                    finally:
+                        histogram.add((perf_counter_ns() - started) // 1000)
+            return wrapper
+        return decorate
+
+    def snapshot(self, extra=None):
+        data = {
+            "histograms_us": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if extra:
+            data.update(extra)
+        return data
+
+    def summary(self):
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            if histogram.count:
+                lines.append(f"{name}: n={histogram.count} mean={histogram.total / histogram.count:.0f}us "
+                             f"p50<={histogram.percentile(0.5)}us p99<={histogram.percentile(0.99)}us "
+                             f"max={histogram.maximum}us")
+        lines.extend(f"{name}: {value}" for name, value in sorted(self.counters.items()))
+        return "\n".join(lines) or "No metrics recorded."
+
+    def dump(self, path=None, extra=None):
+        path = path or self.dump_path
+        if not path:
+            return
+        with open(path, "w") as metrics_file:
+            json.dump(self.snapshot(extra), metrics_file, indent=2)
+
+
+instrumentation = Instrumentation(enabled=bool(os.environ.get(METRICS_ENV)), dump_path=os.environ.get(METRICS_ENV))
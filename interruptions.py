@@ -0,0 +1,145 @@
+import argparse
+import json
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from time import time
+from history import History, DEFAULT_HISTORY_PATH
+from pomodorocore import STARTED, PAUSED, RESUMED, STOPPED, SKIPPED
+
+INTERRUPTION_MARKER = "\u25c9"  # Fisheye
+MARKERS_SHOWN = 6
+POMODOROS_KEPT = 500
+
+
+def interruption_summary(count, shown=MARKERS_SHOWN):
+    """Label text for count interruptions: at most `shown` markers, then the overflow as +n."""
+    text = (INTERRUPTION_MARKER + " ")*min(count, shown)
+    if count > shown:
+        text += f"+{count - shown}"
+    return text
+
+
+class Interruption:
+    __slots__ = ("start", "end", "reason")
+
+    def __init__(self, start, end=None, reason=None):
+        self.start = start
+        self.end = end
+        self.reason = reason
+
+    @property
+    def duration(self):
+        return None if self.end is None else self.end - self.start
+
+
+class PomodoroInterruptions:
+    __slots__ = ("started_at", "interruptions")
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.interruptions = []
+
+    @property
+    def count(self):
+        return len(self.interruptions)
+
+    @property
+    def total_duration(self):
+        return sum(interruption.duration or 0 for interruption in self.interruptions)
+
+
+def interruption_stats(pomodoros, pomodoro_count=None):
+    """Statistics over PomodoroInterruptions; pomodoro_count also counts pomodoros that are not among them."""
+    pomodoro_count = len(pomodoros) if pomodoro_count is None else pomodoro_count
+    counts = [pomodoro.count for pomodoro in pomodoros]
+    interruptions = sum(counts)
+    reasons = Counter(interruption.reason for pomodoro in pomodoros for interruption in pomodoro.interruptions)
+    return {
+        "pomodoros": pomodoro_count,
+        "interruptions": interruptions,
+        "interrupted_pomodoros": sum(1 for count in counts if count),
+        "interruptions_per_pomodoro": interruptions / pomodoro_count if pomodoro_count else 0.0,
+        "max_interruptions": max(counts, default=0),
+        "total_interruption_time": sum(pomodoro.total_duration for pomodoro in pomodoros),
+        "reasons": {reason or "": count for reason, count in reasons.most_common()},
+    }
+
+
+def history_stats(history, started_from, started_before):
+    """interruption_stats() over the pomodoros of this machine that History recorded in the range."""
+    pomodoros = {}
+    for pomodoro_started_at, started_at, ended_at, reason in history.interruptions(started_from, started_before):
+        pomodoro = pomodoros.get(pomodoro_started_at)
+        if pomodoro is None:
+            pomodoro = pomodoros[pomodoro_started_at] = PomodoroInterruptions(pomodoro_started_at)
+        pomodoro.interruptions.append(Interruption(started_at, ended_at, reason))
+    # uninterrupted pomodoros have no rows of their own, so the sessions give the count
+    pomodoro_count = max(len(pomodoros), history.local_pomodoro_count(started_from, started_before))
+    return interruption_stats(list(pomodoros.values()), pomodoro_count)
+
+
+class InterruptionLog:
+    """Core listener keeping a timestamped record of every pause, grouped per pomodoro.
+
+    Times are wall-clock milliseconds. The current pomodoro and the last
+    POMODOROS_KEPT finished ones are held in memory; with a History, the
+    pauses of each finished pomodoro are also stored there.
+    """
+
+    def __init__(self, history=None, wall_clock=time):
+        self.history = history
+        self.wall_clock = wall_clock
+        self.current = None
+        self.finished = deque(maxlen=POMODOROS_KEPT)
+
+    def record(self, event, core):
+        if not core.in_pomodoro:
+            return
+        now = int(self.wall_clock()*1000)
+        if event == STARTED:
+            self.current = PomodoroInterruptions(now)
+        elif self.current is None:
+            return
+        elif event == PAUSED:
+            self.current.interruptions.append(Interruption(now))
+        elif event == RESUMED:
+            self.close_open_interruption(now)
+        elif event in (STOPPED, SKIPPED):
+            self.close_open_interruption(now)
+            self.finished.append(self.current)
+            if self.history is not None and self.current.interruptions:
+                self.history.add_interruptions(self.current.started_at, (
+                    (interruption.start, interruption.end, interruption.reason)
+                    for interruption in self.current.interruptions))
+            self.current = None
+
+    def close_open_interruption(self, now):
+        if self.current.interruptions and self.current.interruptions[-1].end is None:
+            self.current.interruptions[-1].end = now
+
+    def annotate(self, reason):
+        """Attach a reason to the most recent interruption of the current pomodoro."""
+        if self.current is not None and self.current.interruptions:
+            self.current.interruptions[-1].reason = reason
+
+    def stats(self):
+        """Interruption statistics over the finished pomodoros still in memory."""
+        return interruption_stats(self.finished)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interruption statistics of the pomodoros recorded on this machine.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--days", type=int, default=7, help="the last DAYS days")
+    args = parser.parse_args()
+
+    history = History(args.history)
+    try:
+        started_from = int((datetime.now() - timedelta(days=args.days)).timestamp()*1000)
+        print(json.dumps(history_stats(history, started_from, 2**62)))
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import os
+import queue
+import threading
+from collections import namedtuple
+from datetime import date, datetime
+from time import monotonic, time
+from pomodorocore import Totals
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".pypomodoro", "journal.log")
+SYNC_INTERVAL = 1.0  # seconds; records arriving within this window share one fsync
+CHECKPOINT_EVERY = 256  # records
+PROGRESS = "progress"  # periodic record of a running block, so a crash loses at most a minute
+
+# the countdown's elapsed time and limit came last; records written before them have None there
+COUNTDOWN_FIELDS = ("current_time", "time_limit")
+JournalRecord = namedtuple("JournalRecord", ("seq", "wall_time", "event", "state") + Totals._fields + COUNTDOWN_FIELDS,
+                           defaults=(None,)*len(COUNTDOWN_FIELDS))
+TOTALS_START = 4
+FIELD_COUNTS = (len(JournalRecord._fields) - len(COUNTDOWN_FIELDS), len(JournalRecord._fields))
+
+
+def format_record(record):
+    return ("\t".join(str(field) for field in record) + "\n").encode("utf-8")
+
+
+def parse_record(line):
+    fields = line.decode("utf-8").rstrip("\n").split("\t")
+    if len(fields) not in FIELD_COUNTS:
+        raise ValueError(f"expected {' or '.join(map(str, FIELD_COUNTS))} fields, got {len(fields)}")
+    seq, wall_time, event, state, *numbers = fields
+    return JournalRecord(int(seq), int(wall_time), event, state, *(int(number) for number in numbers))
+
+
+def record_totals(record):
+    return Totals(*record[TOTALS_START:TOTALS_START + len(Totals._fields)])
+
+
+def record_date(record):
+    return datetime.fromtimestamp(record.wall_time / 1000).date()
+
+
+def scan_records(path, offset=0):
+    """Yield (end_offset, record) for each complete, well-formed line from offset on.
+
+    Scanning stops at the first torn or corrupt line, since nothing after it can
+    be trusted to be in order.
+    """
+    try:
+        journal_file = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with journal_file:
+        journal_file.seek(offset)
+        for line in journal_file:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = parse_record(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield offset, record
+
+
+def read_records(path, offset=0):
+    for _, record in scan_records(path, offset):
+        yield record
+
+
+class Journal:
+    """Append-only log of timer events with group-committed writes.
+
+    record() only enqueues, so the GUI thread never waits on the disk; a
+    writer thread batches everything that arrives within SYNC_INTERVAL into a
+    single write and fsync. Every record carries the running totals, and a
+    checkpoint file remembers the offset of a recent record, so recovery only
+    has to read the tail of the log.
+
+    A batch that cannot be written, e.g. on a full disk, is cut back off the
+    log and retried with the next group commit; stats() counts the failures
+    and the records still waiting.
+    """
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, sync_interval=SYNC_INTERVAL, wall_clock=time):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.sync_interval = sync_interval
+        self.wall_clock = wall_clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.recovered = self.recover()
+        self.seq = self.recovered.seq if self.recovered is not None else 0
+
+        self.queue = queue.Queue()
+        # unbuffered, so a failed write leaves nothing behind to be written twice
+        self.journal_file = open(path, "ab", buffering=0)
+        self.size = os.fstat(self.journal_file.fileno()).st_size
+        self.records_since_checkpoint = 0
+        self.written = 0
+        self.unwritten = 0
+        self.write_errors = 0
+        self.last_error = None
+        self.writer = threading.Thread(target=self.write_loop, name="journal-writer", daemon=True)
+        self.writer.start()
+
+    def read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                return int(checkpoint_file.read().split()[0])
+        except (FileNotFoundError, IndexError, ValueError):
+            return 0
+
+    def write_checkpoint(self, offset):
+        temporary_path = self.checkpoint_path + ".tmp"
+        with open(temporary_path, "w") as checkpoint_file:
+            checkpoint_file.write(f"{offset}\n")
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def recover(self):
+        """Return the last intact record, truncating any torn tail left by a crash."""
+        offset = self.read_checkpoint()
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if offset > size:
+            offset = 0
+        last = None
+        for offset, last in scan_records(self.path, offset):
+            pass
+        if last is None and offset > 0:
+            # the checkpointed offset did not land on a record; fall back to a full scan
+            offset = 0
+            for offset, last in scan_records(self.path):
+                pass
+        if offset < size:
+            with open(self.path, "r+b") as journal_file:
+                journal_file.truncate(offset)
+        return last
+
+    def recover_today(self):
+        if self.recovered is None or record_date(self.recovered) != date.today():
+            return None
+        return record_totals(self.recovered)
+
+    def record(self, event, core):
+        """Core listener: enqueue the event together with the totals and countdown it produced."""
+        self.seq += 1
+        self.queue.put(JournalRecord(self.seq, int(self.wall_clock()*1000), event, core.state.name,
+                                     *core.totals(), core.state.current_time, core.state.time_limit))
+
+    def write_loop(self):
+        batch = []
+        closing = False
+        while not closing:
+            if not batch:
+                record = self.queue.get()
+                if record is None:
+                    break
+                batch.append(record)
+            deadline = monotonic() + self.sync_interval
+            while True:
+                try:
+                    record = self.queue.get(timeout=max(0.0, deadline - monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    closing = True
+                    break
+                batch.append(record)
+            try:
+                self.write_batch(batch)
+            except OSError as error:
+                # the batch stays for the next group commit, with whatever arrives meanwhile
+                self.write_errors += 1
+                self.last_error = repr(error)
+            else:
+                self.written += len(batch)
+                batch = []
+            self.unwritten = len(batch)
+
+    def write_batch(self, batch):
+        offset = self.size
+        lines = [format_record(record) for record in batch]
+        data = memoryview(b"".join(lines))
+        try:
+            written = 0
+            while written < len(data):
+                written += self.journal_file.write(data[written:])
+            os.fsync(self.journal_file.fileno())
+        except OSError:
+            # a torn line would end the log for recovery, so the next attempt starts where this one did
+            self.journal_file.truncate(offset)
+            raise
+        self.size = offset + len(data)
+
+        self.records_since_checkpoint += len(batch)
+        if self.records_since_checkpoint >= CHECKPOINT_EVERY:
+            last_record_offset = offset + sum(len(line) for line in lines[:-1])
+            try:
+                self.write_checkpoint(last_record_offset)
+            except OSError as error:
+                # the records are safe; only recovery gets slower until the next checkpoint
+                self.write_errors += 1
+                self.last_error = repr(error)
+            else:
+                self.records_since_checkpoint = 0
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "pending": self.queue.qsize(),
+            "unwritten": self.unwritten,
+            "write_errors": self.write_errors,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Write what is queued, one last attempt for a failing batch; returns the records that were lost."""
+        if self.journal_file.closed:
+            return 0
+        self.queue.put(None)
+        self.writer.join()
+        self.journal_file.close()
+        return self.unwritten
@@ -1,10 +1,14 @@
 import sys
 from PySide2.QtWidgets import QApplication, QWidget, QLCDNumber, QGridLayout, QSlider
-from PySide2.QtCore import Qt, Signal
+from PySide2.QtCore import Qt, Signal, QTimer
+
+DEBOUNCE_INTERVAL = 300  # milliseconds without slider movement before a value is committed
 
 
 class LCDNumberSlider(QWidget):
     current_value = Signal(int)
+    # emitted once per settled change: on release after a drag, or after DEBOUNCE_INTERVAL of keyboard/wheel steps
+    value_committed = Signal(int)
 
     def __init__(self, minval, maxval, startval, numdigits, background, color):
         super().__init__()
@@ -18,9 +22,17 @@ class LCDNumberSlider(QWidget):
         self.slider.setMinimum(minval)
         self.slider.setMaximum(maxval)
         self.slider.valueChanged.connect(self.display_slider_value_in_lcd)
+        self.slider.sliderReleased.connect(self.commit_value)
+
+        self.commit_timer = QTimer(self)
+        self.commit_timer.setSingleShot(True)
+        self.commit_timer.setInterval(DEBOUNCE_INTERVAL)
+        self.commit_timer.timeout.connect(self.commit_pending_value)
 
         self.slider.setValue(startval)
         self.display_slider_value_in_lcd()
+        self.commit_timer.stop()
+        self.committed_value = self.slider.value()
 
         grid = QGridLayout()
         grid.addWidget(self.lcd, 0, 0, 4, 4)
@@ -32,6 +44,18 @@ class LCDNumberSlider(QWidget):
     def display_slider_value_in_lcd(self):
         self.lcd.display(f'{{:0{self.lcd.digitCount()}}}'.format(self.slider.value()))
         self.current_value.emit(self.slider.value())
+        self.commit_timer.start()
+
+    def commit_pending_value(self):
+        # while the handle is held, sliderReleased commits instead
+        if not self.slider.isSliderDown():
+            self.commit_value()
+
+    def commit_value(self):
+        self.commit_timer.stop()
+        if self.slider.value() != self.committed_value:
+            self.committed_value = self.slider.value()
+            self.value_committed.emit(self.committed_value)
 
     def get_current_value(self):
         return self.slider.value()
@@ -50,5 +74,6 @@ if __name__ == '__main__':
         print(f"The current value is {value}")
 
     lcd_slider.current_value.connect(print_current_value)
+    lcd_slider.value_committed.connect(lambda value: print(f"The committed value is {value}"))
 
     sys.exit(app.exec_())
@@ -0,0 +1,329 @@
+from collections import namedtuple
+from time import monotonic_ns
+from states import PomodoroState, ShortBreakState, LongBreakState
+import statemachine
+from stopwatch import Stopwatch
+
+MINUTES = 60*1000
+POMODORO_MINUTES = 30
+POMODORO_TIME = POMODORO_MINUTES*MINUTES
+SHORT_BREAK_MINUTES = 6
+SHORT_BREAK_TIME = SHORT_BREAK_MINUTES*MINUTES
+LONG_BREAK_MINUTES = 60
+LONG_BREAK_TIME = LONG_BREAK_MINUTES*MINUTES
+BLINK_INTERVAL = 500  # milliseconds
+
+# Events passed to listeners as listener(event, core)
+STARTED = "start"
+PAUSED = "pause"
+RESUMED = "resume"
+STOPPED = "stop"
+SKIPPED = "skip"
+EXPIRED = "expire"
+NON_POMODORO_STARTED = "non_pomodoro_start"
+NON_POMODORO_STOPPED = "non_pomodoro_stop"
+
+Totals = namedtuple("Totals", "last_task_time all_pomodoro_time all_non_pomodoro_time last_non_pomodoro_time "
+                              "total_pomodoro_count interruption_count")
+
+
+def format_countdown(milliseconds):
+    """MM:SS as the countdown LCD shows it."""
+    return "{:02d}:{:02d}".format(milliseconds // MINUTES, (milliseconds // 1000) % 60)
+
+
+def time_until_rounded_minutes_change(milliseconds):
+    """Milliseconds until round(milliseconds / MINUTES) next changes."""
+    return MINUTES - (milliseconds + MINUTES // 2) % MINUTES
+
+
+class PomodoroCore:
+    """Session logic of the pomodoro timer, free of any Qt dependency.
+
+    All time is measured with the given clock (nanoseconds, monotonic), so a
+    ManualClock can drive it at any speed. Front ends call the action methods
+    and tick(), and learn about changes by subscribing to events.
+
+    `phase` follows statemachine.TRANSITIONS, the table of statediagram.puml;
+    `state` is the countdown of that phase. A break that runs out keeps
+    blinking until it is stopped, as it always has, so only the Stop edge
+    of a break is taken.
+    """
+
+    def __init__(self, pomodoro_time=POMODORO_TIME, short_break_time=SHORT_BREAK_TIME,
+                 long_break_time=LONG_BREAK_TIME, clock=monotonic_ns):
+        self.clock = clock
+        self.pomodoro_state = PomodoroState(pomodoro_time, clock)
+        self.short_break_state = ShortBreakState(short_break_time, clock)
+        self.long_break_state = LongBreakState(long_break_time, clock)
+        self.countdowns = {
+            statemachine.POMODORO: self.pomodoro_state,
+            statemachine.PAUSED: self.pomodoro_state,
+            statemachine.BLINKING: self.pomodoro_state,
+            statemachine.DONE: self.pomodoro_state,
+            statemachine.SHORT_BREAK: self.short_break_state,
+            statemachine.LONG_BREAK: self.long_break_state,
+        }
+        self.phase = statemachine.next_state(statemachine.INITIAL, statemachine.START)
+        self.state = self.countdowns[self.phase]
+
+        self.last_task_stopwatch = Stopwatch(clock)
+        self.all_pomodoro_stopwatch = Stopwatch(clock)
+        self.all_non_pomodoro_stopwatch = Stopwatch(clock)
+        self.last_non_pomodoro_stopwatch = Stopwatch(clock)
+        self.total_pomodoro_count = 0
+        self.interruption_count = 0
+        self.expiry_announced = False
+        # labels of the current pomodoro and non-pomodoro block, set by the front end
+        self.task = ""
+        self.non_pomodoro_task = ""
+
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def fire(self, trigger):
+        self.phase = statemachine.next_state(self.phase, trigger)
+        self.state = self.countdowns[self.phase]
+
+    def emit(self, event):
+        for listener in self.listeners:
+            listener(event, self)
+
+    @property
+    def last_task_time(self):
+        return self.last_task_stopwatch.elapsed()
+
+    @last_task_time.setter
+    def last_task_time(self, value):
+        self.last_task_stopwatch.reset(value)
+
+    @property
+    def all_pomodoro_time(self):
+        return self.all_pomodoro_stopwatch.elapsed()
+
+    @all_pomodoro_time.setter
+    def all_pomodoro_time(self, value):
+        self.all_pomodoro_stopwatch.reset(value)
+
+    @property
+    def all_non_pomodoro_time(self):
+        return self.all_non_pomodoro_stopwatch.elapsed()
+
+    @all_non_pomodoro_time.setter
+    def all_non_pomodoro_time(self, value):
+        self.all_non_pomodoro_stopwatch.reset(value)
+
+    @property
+    def last_non_pomodoro_time(self):
+        return self.last_non_pomodoro_stopwatch.elapsed()
+
+    @last_non_pomodoro_time.setter
+    def last_non_pomodoro_time(self, value):
+        self.last_non_pomodoro_stopwatch.reset(value)
+
+    def set_time_limits(self, pomodoro_time, short_break_time, long_break_time=None):
+        """Apply new limits together; the running countdown keeps its elapsed time."""
+        if long_break_time is None:
+            long_break_time = self.long_break_state.time_limit
+        if pomodoro_time <= 0 or short_break_time <= 0 or long_break_time <= 0:
+            raise ValueError("time limits must be positive")
+        self.pomodoro_state.time_limit = pomodoro_time
+        self.short_break_state.time_limit = short_break_time
+        self.long_break_state.time_limit = long_break_time
+        if not self.expired:
+            # a longer limit can take a countdown back out of its expired state
+            self.expiry_announced = False
+            self.state.show_blink = True
+            if self.phase == statemachine.BLINKING:
+                self.fire(statemachine.LIMIT_EXTENDED)
+
+    def totals(self):
+        return Totals(self.last_task_time, self.all_pomodoro_time, self.all_non_pomodoro_time,
+                      self.last_non_pomodoro_time, self.total_pomodoro_count, self.interruption_count)
+
+    def restore(self, totals):
+        """Continue counting from previously recorded totals, e.g. after a restart."""
+        self.last_task_time = totals.last_task_time
+        self.all_pomodoro_time = totals.all_pomodoro_time
+        self.all_non_pomodoro_time = totals.all_non_pomodoro_time
+        self.total_pomodoro_count = totals.total_pomodoro_count
+        self.interruption_count = totals.interruption_count
+
+    @property
+    def in_pomodoro(self):
+        return self.state is self.pomodoro_state
+
+    @property
+    def expired(self):
+        return self.state.current_time >= self.state.time_limit
+
+    def calculate_display_time(self):
+        if not self.state.show_blink:
+            return ""
+        return format_countdown(self.state.current_time)
+
+    def calculate_total_pomodoro_count(self):
+        return "{:02d}".format(self.total_pomodoro_count)
+
+    def calculate_last_task_time(self):
+        return "{:02d}".format(round(self.last_task_time / 60000.0))
+
+    def calculate_all_tasks_time(self):
+        return "{:03d}".format(round(self.all_pomodoro_time/60000.0) + round(self.all_non_pomodoro_time/60000.0))
+
+    def calculate_pomodoro_tasks_time(self):
+        return "{:03d}".format(round(self.all_pomodoro_time / 60000.0))
+
+    def calculate_non_pomodoro_tasks_time(self):
+        return "{:03d}".format(round(self.all_non_pomodoro_time/60000.0))
+
+    def calculate_non_pomodoro_minutes(self):
+        return "{:03d}".format(round(self.last_non_pomodoro_time / 60000.0))
+
+    def next_change_in(self, seconds_shown=True):
+        """Milliseconds until the next moment anything shown on the display changes.
+
+        With seconds_shown False, seconds are left out, leaving the minute totals
+        and the expiry, for when nobody can see the display. An expired countdown
+        still ticks every BLINK_INTERVAL, since each blink restarts the alarm.
+        """
+        if self.state.non_pomodoro_started:
+            return min(time_until_rounded_minutes_change(self.last_non_pomodoro_time),
+                       time_until_rounded_minutes_change(self.all_non_pomodoro_time))
+        if self.expired:
+            return BLINK_INTERVAL
+        current_time = self.state.current_time
+        next_change = self.state.time_limit - current_time
+        if seconds_shown:
+            next_change = min(next_change, 1000 - current_time % 1000)
+        if self.in_pomodoro:
+            next_change = min(next_change,
+                              time_until_rounded_minutes_change(self.last_task_time),
+                              time_until_rounded_minutes_change(self.all_pomodoro_time))
+        return next_change
+
+    # The can_* checks mirror which buttons the widget enables, for front ends without buttons.
+    def can_start(self):
+        return not self.state.started and not self.state.non_pomodoro_started
+
+    def can_stop(self):
+        return self.state.started and not self.state.non_pomodoro_started
+
+    def can_pause_resume(self):
+        # a paused pomodoro can always resume, even past a limit that was shortened meanwhile
+        return self.in_pomodoro and self.can_stop() and (self.state.paused or not self.expired)
+
+    def can_non_pomodoro_start(self):
+        return not self.state.non_pomodoro_started and (not self.state.started or self.state.paused)
+
+    def can_non_pomodoro_stop(self):
+        return self.state.non_pomodoro_started
+
+    def start(self):
+        self._start()
+        self.emit(STARTED)
+
+    def stop(self):
+        self._stop(STOPPED)
+
+    def skip(self):
+        self._start()
+        self._stop(SKIPPED)
+
+    def pause_resume(self):
+        self.state.paused = not self.state.paused
+        if self.state.paused:
+            self.fire(statemachine.PAUSE)
+            self.stop_countdown()
+            self.interruption_count += 1
+            self.emit(PAUSED)
+        else:
+            self.fire(statemachine.RESUME)
+            self.resume_countdown()
+            self.emit(RESUMED)
+
+    def non_pomodoro_start(self):
+        self.state.non_pomodoro_started = True
+        self.last_non_pomodoro_stopwatch.start()
+        self.all_non_pomodoro_stopwatch.start()
+        self.emit(NON_POMODORO_STARTED)
+
+    def non_pomodoro_stop(self):
+        self.state.non_pomodoro_started = False
+        self.last_non_pomodoro_stopwatch.stop()
+        self.all_non_pomodoro_stopwatch.stop()
+        self.all_non_pomodoro_time = 60000 * round(self.all_non_pomodoro_time / 60000.0)
+        # listeners still see the length of the block that just ended
+        self.emit(NON_POMODORO_STOPPED)
+        self.last_non_pomodoro_time = 0
+
+    def tick(self):
+        """Advance the blink state; returns True while the countdown is over its limit."""
+        if not self.expired:
+            return False
+        self.state.show_blink = not self.state.show_blink
+        if not self.expiry_announced:
+            self.expiry_announced = True
+            if self.in_pomodoro:
+                self.fire(statemachine.TIMER_EXPIRED)
+            self.emit(EXPIRED)
+        return True
+
+    def _start(self):
+        self.state.started = True
+        if self.in_pomodoro:
+            self.last_task_time = 0
+            self.interruption_count = 0
+        self.start_countdown()
+
+    def _stop(self, event):
+        if self.state.paused:
+            # the diagram has no Paused --> Done edge; a paused pomodoro resumes to stop
+            self.fire(statemachine.RESUME)
+        self.state.started = False
+        self.state.paused = False
+        self.stop_countdown()
+
+        if self.in_pomodoro:
+            # 1. Set all_tasks_time rounded to the nearest minute, in milliseconds
+            self.all_pomodoro_time = 60000*round(self.all_pomodoro_time / 60000.0)
+            # 2. increment the total_pomodoro_count counter
+            self.total_pomodoro_count += 1
+
+        # listeners see the state being stopped, before the transition
+        self.emit(event)
+
+        # 3. a pomodoro goes through Done to a short or long break, a break back to Pomodoro
+        self.fire(statemachine.STOP)
+        if self.phase == statemachine.DONE:
+            self.phase = statemachine.break_after(self.total_pomodoro_count)
+            self.state = self.countdowns[self.phase]
+
+        self.reset_countdown()
+
+    def start_countdown(self):
+        if self.expired:
+            self.reset_countdown()
+        self.resume_countdown()
+
+    def resume_countdown(self):
+        self.state.stopwatch.start()
+        if self.in_pomodoro:
+            self.last_task_stopwatch.start()
+            self.all_pomodoro_stopwatch.start()
+
+    def stop_countdown(self):
+        self.state.stopwatch.stop()
+        self.last_task_stopwatch.stop()
+        self.all_pomodoro_stopwatch.stop()
+
+    def reset_countdown(self):
+        self.stop_countdown()
+        self.state.current_time = 0
+        self.state.show_blink = True
+        self.expiry_announced = False
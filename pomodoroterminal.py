@@ -0,0 +1,211 @@
+import argparse
+import curses
+import locale
+import sys
+from datetime import datetime
+from time import strftime, localtime, monotonic_ns, time
+from pomodorocore import PomodoroCore, MINUTES
+from displaycache import DisplayCache
+from journal import Journal, DEFAULT_JOURNAL_PATH, PROGRESS
+from history import History, DEFAULT_HISTORY_PATH
+from interruptions import InterruptionLog, interruption_summary
+from eventbus import EventBus, DEFAULT_HOOKS_PATH, load_hooks
+from sync import Sync, RUN_INTERVAL, all_devices_summary
+from stopwatch import NANOSECONDS_PER_MILLISECOND
+
+# name -> (row, column, width) of each field on screen
+FIELDS = {
+    "today": (0, 0, 16),
+    "total_minutes": (0, 18, 3),
+    "all_devices": (0, 24, 36),
+    "timer": (2, 0, 7),
+    "state": (2, 9, 12),
+    "task_minutes": (4, 0, 2),
+    "interruptions": (4, 4, 20),
+    "total_pomodoros": (6, 0, 2),
+    "total_pomodoro_minutes": (6, 4, 3),
+    "total_non_pomodoro_minutes": (6, 9, 3),
+    "non_pomodoro_start": (8, 0, 6),
+    "non_pomodoro_minutes": (8, 8, 3),
+    "non_pomodoro_stop": (8, 13, 6),
+    "keys": (10, 0, 60),
+}
+
+# key -> (label, guard, action) on PomodoroCore; only keys whose guard holds are offered
+KEYS = {
+    "s": ("start", PomodoroCore.can_start, PomodoroCore.start),
+    "k": ("skip", PomodoroCore.can_start, PomodoroCore.skip),
+    "p": ("pause/resume", PomodoroCore.can_pause_resume, PomodoroCore.pause_resume),
+    "x": ("stop", PomodoroCore.can_stop, PomodoroCore.stop),
+    "n": ("non-pomodoro", PomodoroCore.can_non_pomodoro_start, PomodoroCore.non_pomodoro_start),
+    "m": ("non-pomodoro stop", PomodoroCore.can_non_pomodoro_stop, PomodoroCore.non_pomodoro_stop),
+}
+
+
+def calculate_hhmmss():
+    return strftime("%H%M%S", localtime())
+
+
+def calculate_hhmm():
+    # a running block only wakes the terminal once a minute, so its seconds are not shown
+    return strftime("%H%M--", localtime())
+
+
+class TerminalTimer:
+    """Curses front end for PomodoroCore, for terminals where Qt is not available.
+
+    Every field goes through a DisplayCache, so a tick writes only the cells
+    whose text changed and the terminal is refreshed only when one did.
+    Like the widget, it wakes up exactly when core.next_change_in() says the
+    display changes, and otherwise blocks on the keyboard. With a sync
+    directory it also merges with other machines every RUN_INTERVAL, and
+    shows their day next to its own counters.
+    """
+
+    def __init__(self, screen, journal, history, event_bus, sync=None):
+        self.screen = screen
+        self.journal = journal
+        self.history = history
+        self.event_bus = event_bus
+        self.sync = sync
+        self.display_cache = DisplayCache()
+        self.tick_due = None
+        # the first run happens once the screen is drawn
+        self.sync_due = monotonic_ns() if sync is not None else None
+        self.all_devices = ""
+        self.refreshed = 0
+        self.core = PomodoroCore()
+        totals = self.journal.recover_today()
+        if totals is None:
+            totals = self.history.today_totals()
+        self.core.restore(totals)
+        self.core.subscribe(self.journal.record)
+        self.core.subscribe(self.history.record)
+        self.core.subscribe(InterruptionLog(history).record)
+        self.core.subscribe(self.event_bus.record)
+
+    def put(self, name, text):
+        row, column, width = FIELDS[name]
+        return self.display_cache.update(
+            name, text, lambda text: self.screen.addstr(row, column, text[:width].ljust(width)))
+
+    def show_all(self):
+        core = self.core
+        self.put("today", datetime.now().strftime("%d%b%Y%a"))
+        self.put("total_minutes", core.calculate_all_tasks_time())
+        self.put("all_devices", self.all_devices)
+        self.put("timer", core.state.prefix + " " + core.calculate_display_time())
+        self.put("state", core.state.name)
+        self.put("task_minutes", core.calculate_last_task_time())
+        self.put("interruptions", interruption_summary(core.interruption_count))
+        self.put("total_pomodoros", core.calculate_total_pomodoro_count())
+        self.put("total_pomodoro_minutes", core.calculate_pomodoro_tasks_time())
+        self.put("total_non_pomodoro_minutes", core.calculate_non_pomodoro_tasks_time())
+        if not core.state.non_pomodoro_started:
+            self.put("non_pomodoro_minutes", core.calculate_non_pomodoro_minutes())
+        self.put("keys", "  ".join(f"{key} {label}" for key, (label, guard, action) in KEYS.items()
+                                   if guard(core)) + "  q quit")
+
+    def handle_key(self, key):
+        label, guard, action = KEYS[key]
+        if not guard(self.core):
+            return
+        action(self.core)
+        if self.sync is not None:
+            self.all_devices = all_devices_summary(self.history)
+        if action is PomodoroCore.non_pomodoro_start:
+            self.put("non_pomodoro_start", calculate_hhmmss())
+            self.put("non_pomodoro_stop", calculate_hhmm())
+        elif action is PomodoroCore.non_pomodoro_stop:
+            self.put("non_pomodoro_stop", calculate_hhmmss())
+        self.schedule_next_tick()
+        self.show_all()
+
+    def timer_fired(self):
+        core = self.core
+        if core.state.non_pomodoro_started:
+            self.put("non_pomodoro_minutes", core.calculate_non_pomodoro_minutes())
+            self.put("non_pomodoro_stop", calculate_hhmm())
+        elif core.tick() and core.state.show_blink:
+            curses.beep()
+        if self.put("total_minutes", core.calculate_all_tasks_time()):
+            self.journal.record(PROGRESS, core)
+        self.show_all()
+        self.schedule_next_tick()
+
+    def schedule_next_tick(self):
+        state = self.core.state
+        if state.non_pomodoro_started or (state.started and not state.paused):
+            delay = self.core.next_change_in()
+            if state.non_pomodoro_started:
+                # the stop field shows the wall-clock minute, which turns independently of the block's minutes
+                delay = min(delay, MINUTES - int(time()*1000) % MINUTES)
+            self.tick_due = monotonic_ns() + delay*NANOSECONDS_PER_MILLISECOND
+        else:
+            self.tick_due = None
+
+    def run_sync(self):
+        self.sync.run()
+        self.all_devices = all_devices_summary(self.history)
+        self.put("all_devices", self.all_devices)
+        self.sync_due = monotonic_ns() + RUN_INTERVAL*NANOSECONDS_PER_MILLISECOND
+
+    def run(self):
+        curses.curs_set(0)
+        self.show_all()
+        while True:
+            if self.display_cache.pushed != self.refreshed:
+                self.screen.refresh()
+                self.refreshed = self.display_cache.pushed
+            dues = [due for due in (self.tick_due, self.sync_due) if due is not None]
+            if not dues:
+                self.screen.timeout(-1)
+            else:
+                self.screen.timeout(max(0, (min(dues) - monotonic_ns()) // NANOSECONDS_PER_MILLISECOND))
+            key = self.screen.getch()
+            if key == -1:
+                now = monotonic_ns()
+                if self.sync_due is not None and self.sync_due <= now:
+                    self.run_sync()
+                if self.tick_due is not None and self.tick_due <= now:
+                    self.timer_fired()
+            elif key == ord("q"):
+                return
+            elif key == curses.KEY_RESIZE:
+                self.screen.clear()
+                self.display_cache.invalidate()
+                self.show_all()
+            elif 0 <= key < 256 and chr(key) in KEYS:
+                self.handle_key(chr(key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomodoro timer for the terminal.")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH)
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--hooks", default=DEFAULT_HOOKS_PATH)
+    parser.add_argument("--sync", metavar="DIRECTORY", help="merge with other machines through this shared directory")
+    args = parser.parse_args()
+
+    locale.setlocale(locale.LC_ALL, "")
+    journal = Journal(args.journal)
+    history = History(args.history)
+    sync = Sync(history, args.sync) if args.sync else None
+    event_bus = EventBus()
+    load_hooks(event_bus, args.hooks)
+    if event_bus.last_error is not None:
+        print(f"Some hooks were skipped: {event_bus.last_error}", file=sys.stderr)
+    try:
+        curses.wrapper(lambda screen: TerminalTimer(screen, journal, history, event_bus, sync).run())
+    finally:
+        lost = journal.close()
+        if sync is not None:
+            sync.run()
+        history.close()
+        event_bus.close()
+    if lost:
+        print(f"{lost} journal records could not be written: {journal.last_error}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
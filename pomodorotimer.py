@@ -1,25 +1,32 @@
+import argparse
+import getpass
 import sys
-from time import strftime, localtime
-from PySide2 import QtCore
-from PySide2.QtWidgets import QApplication, QWidget, QLCDNumber, QPushButton, QGridLayout, QLabel
-from PySide2.QtCore import QTimer
-from PySide2.QtGui import QIcon, QFont
-from PySide2.QtMultimedia import QSoundEffect
-from states import PomodoroState, ShortBreakState
+from time import strftime, localtime, monotonic_ns, time
+from PySide2.QtWidgets import QApplication, QWidget, QLCDNumber, QPushButton, QGridLayout, QLabel, QMessageBox, \
+    QShortcut, QLineEdit
+from PySide2.QtCore import Qt, QTimer, QSettings, QEvent, QSocketNotifier
+from PySide2.QtGui import QIcon, QFont, QColor, QPalette, QKeySequence
+from pomodorocore import (PomodoroCore, MINUTES, POMODORO_MINUTES, SHORT_BREAK_MINUTES, LONG_BREAK_MINUTES,
+                          STOPPED, SKIPPED, PAUSED, NON_POMODORO_STARTED, NON_POMODORO_STOPPED)
+from lcdnumberslider import LCDNumberSlider
+from displaycache import DisplayCache
+from journal import Journal, PROGRESS
+from history import History
+from sync import Sync, RUN_INTERVAL, all_devices_summary
+from audio import AudioManager
+from instrumentation import instrumentation
+from interruptions import InterruptionLog, interruption_summary
+from eventbus import EventBus, load_hooks
+from tasks import TaskIndex
+from taskedit import TaskEdit
+from stopwatch import NANOSECONDS_PER_MILLISECOND
 from datetime import datetime
 
-TICK_INTERVAL = 500  # milliseconds
-INTERRUPTION_MARKER = "\u25c9"  # Fisheye
-MINUTES = 60*1000
-POMODORO_MINUTES = 30
-POMODORO_TIME = POMODORO_MINUTES*MINUTES
-SHORT_BREAK_MINUTES = 6
-SHORT_BREAK_TIME = SHORT_BREAK_MINUTES*MINUTES
 BUD_GREEN = "#7bb661"
 
 
 class PomodoroTimer(QWidget):
-    def __init__(self, width, height):
+    def __init__(self, width, height, clock=monotonic_ns, core=None):
         super().__init__()
 
         self.width = width
@@ -28,53 +35,77 @@ class PomodoroTimer(QWidget):
         self.today = datetime.now().strftime("%d%b%Y%a")
 
         self.timer_lcd = PomodoroTimer.create_lcd(digit_count=5, lcd_color="orangered")
-        self.pomodoros_till_long_break_lcd = PomodoroTimer.create_lcd(digit_count=1, lcd_color="slategray")
         self.task_minutes_lcd = PomodoroTimer.create_lcd(digit_count=2, lcd_color="firebrick")
         self.total_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="yellowgreen")
-        self.total_pomodoros_lcd = PomodoroTimer.create_lcd(digit_count=2, lcd_color="peru")
-        self.total_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="dodgerblue")
-        self.total_non_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="blueviolet")
-
-        self.non_pomodoro_start_hhmm_lcd = PomodoroTimer.create_lcd(digit_count=6, lcd_color="skyblue")
-        self.non_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="tomato")
-        self.non_pomodoro_stop_hhmm_lcd = PomodoroTimer.create_lcd(digit_count=6, lcd_color="springgreen")
 
-        self.start_button = PomodoroTimer.create_button("Start", self.handle_start)
-        self.skip_button = PomodoroTimer.create_button("Skip", self.handle_skip)
+        # Start and Skip stay disabled until the secondary panels exist, see setup_secondary_ui()
+        self.start_button = PomodoroTimer.create_button("Start", self.handle_start, enabled=False)
+        self.skip_button = PomodoroTimer.create_button("Skip", self.handle_skip, enabled=False)
         self.pause_resume_button = PomodoroTimer.create_button("Pause", self.handle_pause_resume, enabled=False)
         self.stop_button = PomodoroTimer.create_button("Stop", self.handle_stop, enabled=False)
-        self.non_pomodoro_start_button = PomodoroTimer.create_button("Start", self.handle_non_pomodoro_start)
-        self.non_pomodoro_stop_button = PomodoroTimer.create_button("Stop", self.handle_non_pomodoro_stop, enabled=False)
 
         self.interruptions_label = QLabel()
         self.interruptions_label.setFont(QFont("MesloLGS Nerd Font Mono", 42))
         self.interruptions_label.setStyleSheet("border: 3px solid black;")
 
-        self.last_task_time = 0
-        self.all_pomodoro_time = 0
-        self.all_non_pomodoro_time = 0
-        self.total_pomodoro_count = 0
-        self.pomodoro_state = PomodoroState(POMODORO_TIME)
-        self.short_break_state = ShortBreakState(SHORT_BREAK_TIME)
-        self.state = self.pomodoro_state
-
-        self.last_non_pomodoro_time = 0
-
-        self.ticking_sound = PomodoroTimer.initialize_sound_files('ticking-sound.wav')
-        self.beeping_sound = PomodoroTimer.initialize_sound_files('beeping-sound.wav')
-        self.time_exceeded_sound = PomodoroTimer.initialize_sound_files("time-exceeded-sound.wav")
-
-        self.setup_ui()
-
+        self.settings = QSettings("pypomodoro", "pypomodoro")
+        pomodoro_time = self.settings.value("pomodoro_minutes", POMODORO_MINUTES, type=int)*MINUTES
+        short_break_time = self.settings.value("short_break_minutes", SHORT_BREAK_MINUTES, type=int)*MINUTES
+        long_break_time = self.settings.value("long_break_minutes", LONG_BREAK_MINUTES, type=int)*MINUTES
+        # a core given by the caller, e.g. a daemonclient.DaemonCore, comes with its session's totals
+        own_core = core is None
+        if own_core:
+            core = PomodoroCore(pomodoro_time=pomodoro_time, short_break_time=short_break_time,
+                                long_break_time=long_break_time, clock=clock)
+        else:
+            core.set_time_limits(pomodoro_time, short_break_time, long_break_time)
+        self.core = core
+        self.config_panel = None
+        self.journal = Journal()
+        self.history = History()
+        # merge with other machines through a shared directory, if one is configured, see setup_secondary_ui()
+        sync_directory = self.settings.value("sync_directory", "")
+        self.sync = Sync(self.history, sync_directory) if sync_directory else None
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(RUN_INTERVAL)
+        self.sync_timer.timeout.connect(self.run_sync)
+        if own_core:
+            # the journal also covers a block that was still running when the app went down
+            totals = self.journal.recover_today()
+            if totals is None:
+                totals = self.history.today_totals()
+            self.core.restore(totals)
+        self.interruption_log = InterruptionLog(self.history)
+        self.core.subscribe(self.journal.record)
+        self.core.subscribe(self.history.record)
+        self.core.subscribe(self.interruption_log.record)
+        self.core.subscribe(self.record_task)
+        # hooks run on the bus workers; the handlers only enqueue through the core
+        self.event_bus = EventBus()
+        load_hooks(self.event_bus)
+        self.core.subscribe(self.event_bus.record)
+        self.display_cache = DisplayCache()
+
+        self.audio = AudioManager()
+
+        self.secondary_ui_scheduled = False
+        self.secondary_ui_ready = False
+
+        # single-shot, re-armed for the next instant the display changes
         self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.timer_fired)
+        self.tick_due = None
+        self.display_suspended = False
 
-    @staticmethod
-    def initialize_sound_files(sound_file_name):
-        sound = QSoundEffect()
-        sound.setSource(QtCore.QUrl.fromLocalFile(sound_file_name))
-        sound.setVolume(1.0)
-        return sound
+        self.setup_ui()
+        # the window only learns that it is covered or uncovered through expose events
+        self.windowHandle().installEventFilter(self)
+
+        QShortcut(QKeySequence("Ctrl+,"), self, self.toggle_config_panel)
+        if instrumentation.enabled:
+            QShortcut(QKeySequence("F12"), self, self.show_metrics)
 
     @staticmethod
     def create_lcd(digit_count, lcd_color):
@@ -91,12 +122,40 @@ class PomodoroTimer(QWidget):
         button.clicked.connect(callback)
         return button
 
+    def create_secondary_widgets(self):
+        self.pomodoros_till_long_break_lcd = PomodoroTimer.create_lcd(digit_count=1, lcd_color="slategray")
+        self.total_pomodoros_lcd = PomodoroTimer.create_lcd(digit_count=2, lcd_color="peru")
+        self.total_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="dodgerblue")
+        self.total_non_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="blueviolet")
+
+        self.non_pomodoro_start_hhmm_lcd = PomodoroTimer.create_lcd(digit_count=6, lcd_color="skyblue")
+        self.non_pomodoro_minutes_lcd = PomodoroTimer.create_lcd(digit_count=3, lcd_color="tomato")
+        self.non_pomodoro_stop_hhmm_lcd = PomodoroTimer.create_lcd(digit_count=6, lcd_color="springgreen")
+
+        self.non_pomodoro_start_button = PomodoroTimer.create_button("Start", self.handle_non_pomodoro_start)
+        self.non_pomodoro_stop_button = PomodoroTimer.create_button("Stop", self.handle_non_pomodoro_stop, enabled=False)
+
+        self.task_index = TaskIndex.from_history(self.history)
+        self.task_edit = TaskEdit(self.task_index, "Pomodoro task")
+        self.task_totals_label = QLabel()
+        self.non_pomodoro_task_edit = TaskEdit(self.task_index, "Non-pomodoro task")
+        self.non_pomodoro_task_totals_label = QLabel()
+        self.task_edit.editingFinished.connect(self.handle_task_changed)
+        self.non_pomodoro_task_edit.editingFinished.connect(self.handle_task_changed)
+
+        self.interruption_reason_edit = QLineEdit(enabled=False)
+        self.interruption_reason_edit.setPlaceholderText("Interruption reason")
+        self.interruption_reason_edit.editingFinished.connect(self.handle_interruption_reason)
+
+        # the LCDs count this machine only; merged sessions of the other machines show here
+        self.all_devices_label = QLabel()
+
     def setup_ui(self):
         self.setFixedSize(self.width, self.height)
-        self.setWindowTitle(self.today)
+        self.display_cache.set_window_title(self, self.today)
         self.setWindowIcon(QIcon("tomato.png"))
 
-        main_layout = QGridLayout()
+        main_layout = self.main_layout = QGridLayout()
         today = QLabel(self.today)
         font = QFont("MesloLGS Nerd Font Mono", 42)
         font.setBold(True)
@@ -104,9 +163,9 @@ class PomodoroTimer(QWidget):
         today.setStyleSheet("border: 3px solid black;")
         main_layout.addWidget(today, 0, 0, 3, 8)
         main_layout.addWidget(self.total_minutes_lcd, 0, 8, 3, 8)
-        self.total_minutes_lcd.display(self.calculate_all_tasks_time())
+        self.display_cache.display(self.total_minutes_lcd, self.core.calculate_all_tasks_time())
         main_layout.addWidget(self.timer_lcd, 3, 0, 6, 16)
-        self.timer_lcd.display(self.calculate_display_time())
+        self.display_cache.display(self.timer_lcd, self.core.calculate_display_time())
 
         button_layout = QGridLayout()
         button_layout.addWidget(self.start_button, 0, 0, 1, 1)
@@ -114,224 +173,485 @@ class PomodoroTimer(QWidget):
         button_layout.addWidget(self.pause_resume_button, 0, 2, 1, 1)
         button_layout.addWidget(self.stop_button, 0, 3, 1, 1)
         button_layout.addWidget(self.interruptions_label, 1, 0, 1, 4)
+        self.show_interruptions()
 
         counter_layout = QGridLayout()
         counter_layout.addWidget(self.task_minutes_lcd, 0, 0, 1, 4)
-        self.task_minutes_lcd.display(self.calculate_last_task_time())
+        self.display_cache.display(self.task_minutes_lcd, self.core.calculate_last_task_time())
         counter_layout.addLayout(button_layout, 0, 4, 1, 12)
 
         main_layout.addLayout(counter_layout, 10, 0, 3, 16)
 
+        self.timer_lcd.setPalette(PomodoroTimer.create_palette(self.core.state.lcd_color))
+
+        self.setLayout(main_layout)
+
+        self.show()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.secondary_ui_scheduled:
+            # the countdown is on screen now; build the rest once this frame is out
+            self.secondary_ui_scheduled = True
+            QTimer.singleShot(0, self.setup_secondary_ui)
+
+    def setup_secondary_ui(self):
+        if self.sync is not None:
+            # the shared directory may be a slow mount, so it is read once the countdown is on screen,
+            # and before the task completions are loaded so they include the other machines' tasks
+            self.sync.run()
+        self.create_secondary_widgets()
+        main_layout = self.main_layout
+
         non_pomodoro_layout = QGridLayout()
         non_pomodoro_layout.addWidget(self.non_pomodoro_start_button, 0, 0, 1, 1)
         non_pomodoro_layout.addWidget(self.non_pomodoro_start_hhmm_lcd, 0, 1, 1, 5)
-        self.non_pomodoro_start_hhmm_lcd.display("------")
+        self.display_cache.display(self.non_pomodoro_start_hhmm_lcd, "------")
         non_pomodoro_layout.addWidget(self.non_pomodoro_minutes_lcd, 0, 6, 1, 4)
-        self.non_pomodoro_minutes_lcd.display("---")
+        self.display_cache.display(self.non_pomodoro_minutes_lcd, "---")
         non_pomodoro_layout.addWidget(self.non_pomodoro_stop_hhmm_lcd, 0, 10, 1, 5)
         non_pomodoro_layout.addWidget(self.non_pomodoro_stop_button, 0, 15, 1, 1)
-        self.non_pomodoro_stop_hhmm_lcd.display("------")
+        self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, "------")
         main_layout.addLayout(non_pomodoro_layout, 14, 0, 1, 16)
 
         counter_layout = QGridLayout()
         counter_layout.addWidget(self.total_pomodoros_lcd, 0, 0, 1, 4)
-        self.total_pomodoros_lcd.display(self.calculate_total_pomodoro_count())
+        self.display_cache.display(self.total_pomodoros_lcd, self.core.calculate_total_pomodoro_count())
         counter_layout.addWidget(self.total_pomodoro_minutes_lcd, 0, 4, 1, 6)
-        self.total_pomodoro_minutes_lcd.display(self.calculate_pomodoro_tasks_time())
+        self.display_cache.display(self.total_pomodoro_minutes_lcd, self.core.calculate_pomodoro_tasks_time())
         counter_layout.addWidget(self.total_non_pomodoro_minutes_lcd, 0, 10, 1, 6)
-        self.total_non_pomodoro_minutes_lcd.display(self.calculate_non_pomodoro_tasks_time())
+        self.display_cache.display(self.total_non_pomodoro_minutes_lcd, self.core.calculate_non_pomodoro_tasks_time())
 
         main_layout.addLayout(counter_layout, 15, 0, 3, 16)
 
-        self.timer_lcd.setPalette(self.state.lcd_color)
-
-        self.setLayout(main_layout)
-
-        self.show()
-
+        task_layout = QGridLayout()
+        task_layout.addWidget(self.task_edit, 0, 0, 1, 5)
+        task_layout.addWidget(self.task_totals_label, 0, 5, 1, 3)
+        task_layout.addWidget(self.non_pomodoro_task_edit, 0, 8, 1, 5)
+        task_layout.addWidget(self.non_pomodoro_task_totals_label, 0, 13, 1, 3)
+        task_layout.addWidget(self.interruption_reason_edit, 1, 0, 1, 16)
+        task_layout.addWidget(self.all_devices_label, 2, 0, 1, 16)
+        main_layout.addLayout(task_layout, 18, 0, 3, 16)
+        self.show_task_totals()
+        self.show_all_devices_totals()
+        if self.sync is not None:
+            self.sync_timer.start()
+
+        self.show_controls()
+        self.secondary_ui_ready = True
+        if self.event_bus.last_error is not None:
+            # the hooks file is optional; the timer runs without the hooks that could not be loaded
+            warning = QMessageBox(QMessageBox.Warning, "Hooks", f"Some hooks were skipped: {self.event_bus.last_error}",
+                                  QMessageBox.Ok, self)
+            warning.setAttribute(Qt.WA_DeleteOnClose)
+            warning.open()
+
+    @instrumentation.timed("handle_pause_resume")
     def handle_pause_resume(self):
-        self.state.paused = not self.state.paused
+        self.core.pause_resume()
         self.pause_resume_button.setText(self.calculate_pause_resume_btn_text())
-        if self.state.paused:
-            self.timer.stop()
-            self.ticking_sound.stop()
-            old_text = self.interruptions_label.text()
-            self.interruptions_label.setText(old_text + INTERRUPTION_MARKER + " ")
+        if self.core.state.paused:
+            self.stop_countdown()
+            self.audio.stop_ticking()
+            self.show_interruptions()
             self.non_pomodoro_start_button.setEnabled(True)
+            # the reason goes to this pause, and can still be typed after resuming
+            self.interruption_reason_edit.clear()
+            self.interruption_reason_edit.setEnabled(True)
+            self.interruption_reason_edit.setFocus()
         else:
-            self.timer.start()
+            self.schedule_next_tick()
             self.non_pomodoro_start_button.setEnabled(False)
 
+    @instrumentation.timed("handle_non_pomodoro_start")
     def handle_non_pomodoro_start(self):
-        self.state.non_pomodoro_started = True
+        self.core.non_pomodoro_start()
         self.non_pomodoro_start_button.setEnabled(False)
         self.non_pomodoro_stop_button.setEnabled(True)
-        if self.state.paused:
+        if self.core.state.paused:
             self.pause_resume_button.setEnabled(False)
             self.stop_button.setEnabled(False)
         else:
             self.start_button.setEnabled(False)
             self.skip_button.setEnabled(False)
-        self.timer.start(TICK_INTERVAL)
-        self.non_pomodoro_start_hhmm_lcd.display(PomodoroTimer.calculate_hhmmss())
-        self.non_pomodoro_minutes_lcd.display(self.calculate_non_pomodoro_minutes())
-        self.non_pomodoro_stop_hhmm_lcd.display(PomodoroTimer.calculate_hhmmss())
+        self.schedule_next_tick()
+        self.display_cache.display(self.non_pomodoro_start_hhmm_lcd, PomodoroTimer.calculate_hhmmss())
+        self.display_cache.display(self.non_pomodoro_minutes_lcd, self.core.calculate_non_pomodoro_minutes())
+        self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, PomodoroTimer.calculate_hhmm())
 
+    @instrumentation.timed("handle_non_pomodoro_stop")
     def handle_non_pomodoro_stop(self):
-        self.state.non_pomodoro_started = False
+        self.core.non_pomodoro_stop()
+        self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, PomodoroTimer.calculate_hhmmss())
         self.non_pomodoro_start_button.setEnabled(True)
         self.non_pomodoro_stop_button.setEnabled(False)
-        if self.state.paused:
+        if self.core.state.paused:
             self.pause_resume_button.setEnabled(True)
             self.stop_button.setEnabled(True)
         else:
             self.start_button.setEnabled(True)
             self.skip_button.setEnabled(True)
         self.timer.stop()
-        self.all_non_pomodoro_time = 60000 * round(self.all_non_pomodoro_time / 60000.0)
-        self.last_non_pomodoro_time = 0
-
-    def calculate_pause_resume_btn_text(self):
-        return "Resume" if self.state.paused else "Pause"
-
-    def calculate_display_time(self):
-        if not self.state.show_blink:
-            return ""
-        minutes = self.state.current_time // (1000 * 60)
-        seconds = (self.state.current_time // 1000) % 60
-        amount_of_time = "{:02d}:{:02d}".format(minutes, seconds)
-        return amount_of_time
-
-    def calculate_total_pomodoro_count(self):
-        return "{:02d}".format(self.total_pomodoro_count)
 
-    def calculate_last_task_time(self):
-        return "{:02d}".format(round(self.last_task_time / 60000.0))
-
-    def calculate_all_tasks_time(self):
-        return "{:03d}".format(round(self.all_pomodoro_time/60000.0) + round(self.all_non_pomodoro_time/60000.0))
-
-    def calculate_pomodoro_tasks_time(self):
-        return "{:03d}".format(round(self.all_pomodoro_time / 60000.0))
+    def show_controls(self):
+        """Enable the buttons the core allows now, and keep the countdown going if a block is running."""
+        core = self.core
+        self.start_button.setEnabled(core.can_start())
+        self.skip_button.setEnabled(core.can_start())
+        self.pause_resume_button.setEnabled(core.can_pause_resume())
+        self.pause_resume_button.setText(self.calculate_pause_resume_btn_text())
+        self.stop_button.setEnabled(core.can_stop())
+        self.non_pomodoro_start_button.setEnabled(core.can_non_pomodoro_start())
+        self.non_pomodoro_stop_button.setEnabled(core.can_non_pomodoro_stop())
+        if core.state.non_pomodoro_started or (core.state.started and not core.state.paused):
+            self.schedule_next_tick()
+        else:
+            self.stop_countdown()
+
+    def show_remote_change(self, event):
+        """Follow what another client of the daemon session did, see daemonclient.DaemonCore; None means anything."""
+        if not self.secondary_ui_ready:
+            return  # setup_secondary_ui() shows the core as it is by then
+        core = self.core
+        if event in (STOPPED, SKIPPED, None):
+            self.show_stopped()
+        elif event == PAUSED:
+            self.audio.stop_ticking()
+        elif event == NON_POMODORO_STARTED:
+            self.display_cache.display(self.non_pomodoro_start_hhmm_lcd, PomodoroTimer.calculate_hhmmss())
+            self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, PomodoroTimer.calculate_hhmm())
+        elif event == NON_POMODORO_STOPPED:
+            self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, PomodoroTimer.calculate_hhmmss())
+        self.timer_lcd.setPalette(PomodoroTimer.create_palette(core.state.lcd_color))
+        self.show_interruptions()
+        self.show_progress()
+        self.show_task_totals()
+        self.show_controls()
 
-    def calculate_non_pomodoro_tasks_time(self):
-        return "{:03d}".format(round(self.all_non_pomodoro_time/60000.0))
+    def calculate_pause_resume_btn_text(self):
+        return "Resume" if self.core.state.paused else "Pause"
 
     @staticmethod
     def calculate_hhmmss():
         return strftime("%H%M%S", localtime())
 
-    def calculate_non_pomodoro_minutes(self):
-        return "{:03d}".format(round(self.last_non_pomodoro_time / 60000.0))
+    @staticmethod
+    def calculate_hhmm():
+        # a running block only wakes the widget once a minute, so its seconds are not shown
+        return strftime("%H%M--", localtime())
 
+    @staticmethod
+    def create_palette(lcd_color):
+        palette = QPalette()
+        palette.setColor(QPalette.Foreground, QColor(lcd_color))
+        return palette
+
+    @instrumentation.timed("handle_start")
     def handle_start(self):
-        self.state.started = True
+        in_pomodoro = self.core.in_pomodoro
+        self.core.start()
+        self.show_started()
+        if in_pomodoro:
+            self.pause_resume_button.setEnabled(True)
+            self.show_interruptions()
+
+    @instrumentation.timed("handle_stop")
+    def handle_stop(self):
+        self.core.stop()
+        self.show_stopped()
+
+    @instrumentation.timed("handle_skip")
+    def handle_skip(self):
+        in_pomodoro = self.core.in_pomodoro
+        self.core.skip()
+        if in_pomodoro:
+            self.show_interruptions()
+        self.show_stopped()
+
+    def show_interruptions(self):
+        self.display_cache.set_text(self.interruptions_label, interruption_summary(self.core.interruption_count))
+
+    def handle_interruption_reason(self):
+        self.interruption_log.annotate(self.interruption_reason_edit.text().strip() or None)
+
+    def handle_task_changed(self):
+        self.core.task = self.task_edit.task()
+        self.core.non_pomodoro_task = self.non_pomodoro_task_edit.task()
+        self.show_task_totals()
+
+    def record_task(self, event, core):
+        # subscribed after the history, so the session is already in the task rollups
+        if event in (STOPPED, SKIPPED) and core.in_pomodoro:
+            self.task_index.add(core.task)
+        elif event == NON_POMODORO_STOPPED:
+            self.task_index.add(core.non_pomodoro_task)
+        else:
+            return
+        if self.secondary_ui_ready:
+            self.show_task_totals()
+            self.show_all_devices_totals()
+
+    def show_task_totals(self):
+        core = self.core
+        running = core.last_task_time if core.in_pomodoro and core.state.started else 0
+        self.display_cache.set_text(self.task_totals_label, self.calculate_task_totals(core.task, running))
+        running = core.last_non_pomodoro_time if core.state.non_pomodoro_started else 0
+        self.display_cache.set_text(self.non_pomodoro_task_totals_label,
+                                    self.calculate_task_totals(core.non_pomodoro_task, running))
+
+    def run_sync(self):
+        if self.sync is None:
+            return
+        self.sync.run()
+        if self.secondary_ui_ready:
+            self.show_all_devices_totals()
+
+    def show_all_devices_totals(self):
+        self.all_devices_label.setVisible(self.sync is not None)
+        if self.sync is not None:
+            self.display_cache.set_text(self.all_devices_label, all_devices_summary(self.history))
+
+    def calculate_task_totals(self, task, running_time):
+        """Minutes on the task today and this week, counting the block still running."""
+        if not task:
+            return ""
+        day, week = self.history.task_totals(task)
+        return "{}m today, {}m week".format(
+            round((day.pomodoro_time + day.non_pomodoro_time + running_time) / 60000.0),
+            round((week.pomodoro_time + week.non_pomodoro_time + running_time) / 60000.0))
+
+    def show_started(self):
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.skip_button.setEnabled(False)
         self.non_pomodoro_start_button.setEnabled(False)
-        if self.state is self.pomodoro_state:
-            self.pause_resume_button.setEnabled(True)
-            self.last_task_time = 0
-            self.interruptions_label.setText("")
-        self.start_countdown()
+        self.schedule_next_tick()
 
-    def handle_stop(self):
-        self.state.started = False
+    def show_stopped(self):
         self.pause_resume_button.setEnabled(False)
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.skip_button.setEnabled(True)
         self.non_pomodoro_start_button.setEnabled(True)
-        self.state.paused = False
+        self.interruption_reason_edit.clear()
+        self.interruption_reason_edit.setEnabled(False)
         self.pause_resume_button.setText(self.calculate_pause_resume_btn_text())
-        self.setWindowTitle(self.today)
-
-        if self.state is self.pomodoro_state:
-            # 1. Set all_tasks_time rounded to the nearest minute, in milliseconds
-            self.all_pomodoro_time = 60000*round(self.all_pomodoro_time / 60000.0)
-            # 2. increment the total_pomodoro_count counter and update the lcd
-            self.total_pomodoro_count += 1
-            self.total_pomodoros_lcd.display(self.calculate_total_pomodoro_count())
-            # 3. transition to the short break state
-            self.state = self.short_break_state
-        else:
-            # we are stopping the short break; only allowed action is to start a new pomodoro
-            self.state = self.pomodoro_state
-
-        self.timer_lcd.setPalette(self.state.lcd_color)
-        self.reset_countdown()
-        self.ticking_sound.stop()
-        self.beeping_sound.stop()
-        self.time_exceeded_sound.stop()
-
-    def handle_skip(self):
-        self.handle_start()
-        self.handle_stop()
+        self.display_cache.set_window_title(self, self.today)
+        self.stop_countdown()
+        self.display_cache.display(self.total_pomodoros_lcd, self.core.calculate_total_pomodoro_count())
+        self.timer_lcd.setPalette(PomodoroTimer.create_palette(self.core.state.lcd_color))
+        self.display_cache.display(self.timer_lcd, self.core.calculate_display_time())
+        self.audio.stop_all()
+
+    def create_config_panel(self):
+        panel = QWidget(self, Qt.Tool)
+        panel.setWindowTitle("Configuration")
+        self.pomodoro_time_lcdslider = LCDNumberSlider(
+            minval=1, maxval=90, startval=self.core.pomodoro_state.time_limit // MINUTES, numdigits=2,
+            background=BUD_GREEN, color="black")
+        self.short_break_time_lcdslider = LCDNumberSlider(
+            minval=1, maxval=30, startval=self.core.short_break_state.time_limit // MINUTES, numdigits=2,
+            background=BUD_GREEN, color="black")
+        self.long_break_time_lcdslider = LCDNumberSlider(
+            minval=1, maxval=60, startval=self.core.long_break_state.time_limit // MINUTES, numdigits=2,
+            background=BUD_GREEN, color="black")
+
+        layout = QGridLayout()
+        layout.addWidget(QLabel("Pomodoro"), 0, 0)
+        layout.addWidget(self.pomodoro_time_lcdslider, 1, 0)
+        layout.addWidget(QLabel("Short Break"), 0, 1)
+        layout.addWidget(self.short_break_time_lcdslider, 1, 1)
+        layout.addWidget(QLabel("Long Break"), 0, 2)
+        layout.addWidget(self.long_break_time_lcdslider, 1, 2)
+        self.sync_directory_edit = QLineEdit(self.settings.value("sync_directory", ""))
+        self.sync_directory_edit.setPlaceholderText("Directory shared with other machines, empty to not sync")
+        layout.addWidget(QLabel("Sync directory"), 2, 0)
+        layout.addWidget(self.sync_directory_edit, 3, 0, 1, 3)
+        panel.setLayout(layout)
+
+        self.sync_directory_edit.editingFinished.connect(self.handle_sync_directory_changed)
+
+        self.pomodoro_time_lcdslider.value_committed.connect(self.handle_config_changes)
+        self.short_break_time_lcdslider.value_committed.connect(self.handle_config_changes)
+        self.long_break_time_lcdslider.value_committed.connect(self.handle_config_changes)
+        return panel
+
+    def toggle_config_panel(self):
+        if self.config_panel is None:
+            self.config_panel = self.create_config_panel()
+        self.config_panel.setVisible(not self.config_panel.isVisible())
 
     def handle_config_changes(self):
-        self.pomodoro_state.time_limit = self.pomodoro_time_lcdslider.get_current_value()*MINUTES
-        self.short_break_state.time_limit = self.short_break_time_lcdslider.get_current_value()*MINUTES
-        self.long_break_state.time_limit = self.long_break_time_lcdslider.get_current_value()*MINUTES
+        pomodoro_minutes = self.pomodoro_time_lcdslider.get_current_value()
+        short_break_minutes = self.short_break_time_lcdslider.get_current_value()
+        long_break_minutes = self.long_break_time_lcdslider.get_current_value()
+        expired = self.core.expired
+        self.core.set_time_limits(pomodoro_minutes*MINUTES, short_break_minutes*MINUTES, long_break_minutes*MINUTES)
+        if expired and not self.core.expired:
+            # a longer limit ends the alarm, and releases it, before the next tick starts the ticking again
+            self.audio.stop_all()
+        self.settings.setValue("pomodoro_minutes", pomodoro_minutes)
+        self.settings.setValue("short_break_minutes", short_break_minutes)
+        self.settings.setValue("long_break_minutes", long_break_minutes)
+        # the running countdown may now expire sooner, later, or not at all
+        if self.timer.isActive():
+            self.schedule_next_tick()
+        if not self.core.state.non_pomodoro_started:
+            self.pause_resume_button.setEnabled(self.core.can_pause_resume())
 
-    def timer_fired(self):
-        if self.state.non_pomodoro_started:
-            self.last_non_pomodoro_time += TICK_INTERVAL
-            self.all_non_pomodoro_time += TICK_INTERVAL
-            self.non_pomodoro_minutes_lcd.display(self.calculate_non_pomodoro_minutes())
-            self.total_minutes_lcd.display(self.calculate_all_tasks_time())
-            self.total_non_pomodoro_minutes_lcd.display(self.calculate_non_pomodoro_tasks_time())
-            self.non_pomodoro_stop_hhmm_lcd.display(PomodoroTimer.calculate_hhmmss())
+    def handle_sync_directory_changed(self):
+        sync_directory = self.sync_directory_edit.text().strip()
+        if sync_directory == self.settings.value("sync_directory", ""):
             return
-
-        if self.state.current_time >= self.state.time_limit:
-            self.state.show_blink = not self.state.show_blink
-            self.ticking_sound.stop()
-            self.pause_resume_button.setEnabled(False)
-            if self.state is self.pomodoro_state:
-                self.time_exceeded_sound.stop()
-                self.time_exceeded_sound.play()
+        self.settings.setValue("sync_directory", sync_directory)
+        self.sync_timer.stop()
+        self.sync = Sync(self.history, sync_directory) if sync_directory else None
+        if self.sync is not None:
+            self.sync.run()
+            self.sync_timer.start()
+        if self.secondary_ui_ready:
+            self.show_all_devices_totals()
+
+    @instrumentation.timed("timer_fired")
+    def timer_fired(self):
+        if instrumentation.enabled:
+            instrumentation.observe("tick_lateness", (monotonic_ns() - self.tick_due) // 1000)
+        core = self.core
+        if not core.state.non_pomodoro_started:
+            if core.tick():
+                self.pause_resume_button.setEnabled(False)
+                self.audio.play_alarm(core.in_pomodoro)
             else:
-                self.beeping_sound.stop()
-                self.beeping_sound.play()
+                self.audio.start_ticking()
+        self.show_progress()
+        self.schedule_next_tick()
+
+    def show_progress(self):
+        core = self.core
+        if core.state.non_pomodoro_started:
+            self.display_cache.display(self.non_pomodoro_minutes_lcd, core.calculate_non_pomodoro_minutes())
+            self.display_cache.display(self.total_non_pomodoro_minutes_lcd, core.calculate_non_pomodoro_tasks_time())
+            self.display_cache.display(self.non_pomodoro_stop_hhmm_lcd, PomodoroTimer.calculate_hhmm())
         else:
-            self.ticking_sound.stop()
-            self.ticking_sound.play()
-
-        self.state.current_time += TICK_INTERVAL
-
-        if self.state is self.pomodoro_state:
-            self.last_task_time += TICK_INTERVAL
-            self.all_pomodoro_time += TICK_INTERVAL
-
-        self.timer_lcd.display(self.calculate_display_time())
-        self.task_minutes_lcd.display(self.calculate_last_task_time())
-        self.total_minutes_lcd.display(self.calculate_all_tasks_time())
-        self.total_pomodoro_minutes_lcd.display(self.calculate_pomodoro_tasks_time())
-        self.setWindowTitle(self.state.prefix + " " + self.calculate_display_time())
-
-    def start_countdown(self):
-        if self.state.current_time >= self.state.time_limit:
-            self.reset_countdown()
-        self.timer.start(TICK_INTERVAL)
+            display_time = core.calculate_display_time()
+            self.display_cache.display(self.timer_lcd, display_time)
+            self.display_cache.display(self.task_minutes_lcd, core.calculate_last_task_time())
+            self.display_cache.display(self.total_pomodoro_minutes_lcd, core.calculate_pomodoro_tasks_time())
+            self.display_cache.set_window_title(self, core.state.prefix + " " + display_time)
+        # the cache reports the change even while the display is suspended
+        if self.display_cache.display(self.total_minutes_lcd, core.calculate_all_tasks_time()):
+            self.journal.record(PROGRESS, core)
+            self.show_task_totals()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_display_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_display_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_display_visibility()
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Expose:
+            self.update_display_visibility()
+        return False
+
+    def update_display_visibility(self):
+        """Stop drawing while the window is hidden, minimized or covered; catch up in one repaint."""
+        window = self.windowHandle()
+        suspended = not self.isVisible() or self.isMinimized() or (window is not None and not window.isExposed())
+        if suspended == self.display_suspended:
+            return
+        self.display_suspended = suspended
+        if suspended:
+            self.display_cache.suspend()
+        else:
+            self.setUpdatesEnabled(False)
+            self.display_cache.resume()
+            if self.timer.isActive():
+                self.show_progress()
+            self.setUpdatesEnabled(True)
+        # alarms and journal progress still need their ticks, the seconds do not; the cache drops the drawing
+        if self.timer.isActive():
+            self.schedule_next_tick()
+
+    def closeEvent(self, event):
+        lost = self.journal.close()
+        if lost:
+            QMessageBox.warning(self, "Journal", f"{lost} journal records could not be written: "
+                                                 f"{self.journal.last_error}")
+        self.sync_timer.stop()
+        if self.sync is not None:
+            self.sync.run()
+        self.history.close()
+        self.event_bus.close()
+        instrumentation.dump(extra={"display_cache": self.display_cache.stats(), "event_bus": self.event_bus.stats(),
+                                    "journal": self.journal.stats(), "interruptions": self.interruption_log.stats()})
+        super().closeEvent(event)
+
+    def show_metrics(self):
+        QMessageBox.information(self, "Metrics", instrumentation.summary() + "\n\nLCD updates: " +
+                                ", ".join(f"{key} {value}" for key, value in self.display_cache.stats().items()) +
+                                "\nHook events: " +
+                                ", ".join(f"{key} {value}" for key, value in self.event_bus.stats().items()) +
+                                "\nJournal: " +
+                                ", ".join(f"{key} {value}" for key, value in self.journal.stats().items()) +
+                                "\nInterruptions: " +
+                                ", ".join(f"{key} {value}" for key, value in self.interruption_log.stats().items()))
+
+    def schedule_next_tick(self):
+        delay = self.core.next_change_in(seconds_shown=not self.display_suspended)
+        if self.core.state.non_pomodoro_started:
+            # the stop LCD shows the wall-clock minute, which turns independently of the block's minutes
+            delay = min(delay, MINUTES - int(time()*1000) % MINUTES)
+        self.tick_due = monotonic_ns() + delay*NANOSECONDS_PER_MILLISECOND
+        self.timer.start(delay)
 
     def stop_countdown(self):
         if self.timer.isActive():
             self.timer.stop()
 
-    def reset_countdown(self):
-        self.stop_countdown()
-        self.state.current_time = 0
-        self.state.show_blink = True
-        self.timer_lcd.display(self.calculate_display_time())
+
+def main():
+    parser = argparse.ArgumentParser(description="Pomodoro timer.")
+    parser.add_argument("width", type=int, nargs="?", default=600)
+    parser.add_argument("height", type=int, nargs="?", default=400)
+    parser.add_argument("--daemon", nargs="?", const="", metavar="SOCKET",
+                        help="run the session on a timerdaemon, at its default socket unless one is given")
+    parser.add_argument("--session", default=getpass.getuser(), help="daemon session to join (default: user name)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    core = None
+    if args.daemon is not None:
+        # only daemon mode pays for importing the client, and the daemon's asyncio with it
+        from daemonclient import DaemonCore
+        from timerdaemon import DEFAULT_SOCKET_PATH
+        try:
+            core = DaemonCore(args.session, args.daemon or DEFAULT_SOCKET_PATH)
+        except OSError as error:
+            sys.exit(f"Cannot reach the timer daemon: {error}")
+    window = PomodoroTimer(width=args.width, height=args.height, core=core)
+    if core is not None:
+        # changes reach the window after the handler that may have caused them, e.g. a refused start, returns
+        core.followers.append(lambda event: QTimer.singleShot(0, lambda: window.show_remote_change(event)))
+        notifier = QSocketNotifier(core.watch.fileno(), QSocketNotifier.Read, window)
+
+        def read_events():
+            core.read_events()
+            notifier.setEnabled(core.connected)
+
+        notifier.activated.connect(read_events)
+    status = app.exec_()
+    if core is not None:
+        core.close()
+    sys.exit(status)
 
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    width = 600
-    height = 400
-    if len(sys.argv) == 3:
-        width = int(sys.argv[1])
-        height = int(sys.argv[2])
-    window = PomodoroTimer(width=width, height=height)
-    sys.exit(app.exec_())
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import json
+from collections import namedtuple
+from time import perf_counter
+from journal import DEFAULT_JOURNAL_PATH, PROGRESS, read_records, record_date, record_totals
+from pomodorocore import (PomodoroCore, Totals, format_countdown, STARTED, PAUSED, RESUMED, STOPPED, SKIPPED, EXPIRED,
+                          NON_POMODORO_STARTED, NON_POMODORO_STOPPED)
+from stopwatch import ManualClock
+import statemachine
+
+# Limit of a countdown until a record gives it one; journals from before limits were recorded never give any.
+NEVER = 2**62
+JITTER = 50  # milliseconds the wall-clock timestamps of records may be off from the monotonic totals
+NO_TOTALS = Totals(0, 0, 0, 0, 0, 0)
+PHASES = {"pomodoro": statemachine.POMODORO, "short_break": statemachine.SHORT_BREAK,
+          "long_break": statemachine.LONG_BREAK}
+
+
+def can_expire(core):
+    # the wall-clock timestamp of the expiry may be up to JITTER early
+    return (core.state.started and not core.state.paused and not core.expiry_announced and
+            core.state.current_time + JITTER >= core.state.time_limit)
+
+
+def expire(core):
+    if not core.expired:
+        core.state.current_time = core.state.time_limit
+    core.tick()
+
+
+# event -> (guard, action) on PomodoroCore; events without an action only compare
+ACTIONS = {
+    STARTED: (PomodoroCore.can_start, PomodoroCore.start),
+    PAUSED: (lambda core: core.can_pause_resume() and not core.state.paused, PomodoroCore.pause_resume),
+    RESUMED: (lambda core: core.state.paused, PomodoroCore.pause_resume),
+    STOPPED: (PomodoroCore.can_stop, PomodoroCore.stop),
+    SKIPPED: (PomodoroCore.can_start, PomodoroCore.skip),
+    NON_POMODORO_STARTED: (PomodoroCore.can_non_pomodoro_start, PomodoroCore.non_pomodoro_start),
+    NON_POMODORO_STOPPED: (PomodoroCore.can_non_pomodoro_stop, PomodoroCore.non_pomodoro_stop),
+    EXPIRED: (can_expire, expire),
+    PROGRESS: (None, None),
+}
+
+# LCD name -> the core method computing what it shows from the totals
+LCDS = (
+    ("total_pomodoros", PomodoroCore.calculate_total_pomodoro_count),
+    ("task_minutes", PomodoroCore.calculate_last_task_time),
+    ("total_minutes", PomodoroCore.calculate_all_tasks_time),
+    ("total_pomodoro_minutes", PomodoroCore.calculate_pomodoro_tasks_time),
+    ("total_non_pomodoro_minutes", PomodoroCore.calculate_non_pomodoro_tasks_time),
+    ("non_pomodoro_minutes", PomodoroCore.calculate_non_pomodoro_minutes),
+)
+# the blink phase is not journaled, so the countdown is compared as it shows while the blink is on
+LCD_NAMES = ("state", "timer") + tuple(name for name, _ in LCDS)
+
+# what a core shows as it emits an event, with the raw values behind it
+Shown = namedtuple("Shown", "lcds totals countdown")
+Mismatch = namedtuple("Mismatch", "seq wall_time event expected actual")
+Restart = namedtuple("Restart", "seq wall_time event reason")
+
+
+def lcd_values(core):
+    return ((core.state.name, format_countdown(core.state.current_time)) +
+            tuple(calculate(core) for _, calculate in LCDS))
+
+
+def shown(core):
+    return Shown(lcd_values(core), core.totals(), core.state.current_time)
+
+
+def restore(core, totals):
+    core.restore(totals)
+    core.last_non_pomodoro_time = totals.last_non_pomodoro_time
+
+
+def agree(expected, actual):
+    """Whether the replayed LCDs match the recorded ones; a None in expected was not recorded."""
+    return actual is not None and all(value is None or value == replayed
+                                      for value, replayed in zip(expected, actual.lcds))
+
+
+def within_jitter(record, actual):
+    differences = [first - second for first, second in zip(actual.totals, record_totals(record))]
+    if record.current_time is not None and actual.lcds[0] == record.state:
+        differences.append(actual.countdown - record.current_time)
+    return actual.lcds[0] == record.state and all(abs(difference) <= JITTER for difference in differences)
+
+
+class Replay:
+    """Feeds journal records through PomodoroCore on a ManualClock and compares every LCD value.
+
+    The clock advances by the wall-clock gaps between records, and each
+    countdown gets the limit recorded with it, the way the configuration panel
+    sets one. Each record is applied as the action that produced it, and what
+    the LCDs would show when the core emits the event, the countdown included,
+    is compared with what the record shows. An expiry is replayed by ticking a
+    countdown that has really run out.
+
+    The app may have been restarted between two records, e.g. after a crash.
+    Where the replayed core refuses a record, or a new day begins, the record
+    is tried on a new core seeded the way the app seeds one: from the previous
+    record on the same day, from zero on a new day. If that explains it, the
+    restart is reported on its own rather than as a mismatch. After a mismatch
+    the core is reset to the recorded totals and countdown, and moved to the
+    recorded countdown where the record shows which one runs, so each
+    difference is reported once, where it arises.
+    """
+
+    def __init__(self):
+        self.clock = ManualClock()
+        self.expected_core = self.new_core(NO_TOTALS)
+        self.core = self.new_core(NO_TOTALS)
+        self.previous = None
+        self.emitted = None
+        self.records = 0
+        self.restarts = 0
+        self.jitter = 0
+        self.mismatches = 0
+
+    def new_core(self, totals):
+        core = PomodoroCore(pomodoro_time=NEVER, short_break_time=NEVER, long_break_time=NEVER, clock=self.clock)
+        core.restore(totals)
+        core.subscribe(self.capture)
+        return core
+
+    def capture(self, event, core):
+        self.emitted = shown(core)
+
+    def expected(self, record):
+        restore(self.expected_core, record_totals(record))
+        timer = None if record.current_time is None else format_countdown(record.current_time)
+        return (record.state, timer) + lcd_values(self.expected_core)[2:]
+
+    @staticmethod
+    def apply_limit(core, record):
+        """Give the record's countdown its recorded limit, as the configuration panel would have."""
+        if record.time_limit is None:
+            return
+        countdowns = (core.pomodoro_state, core.short_break_state, core.long_break_state)
+        limits = [record.time_limit if state.name == record.state else state.time_limit for state in countdowns]
+        if limits != [state.time_limit for state in countdowns]:
+            core.set_time_limits(*limits)
+
+    def apply(self, core, record):
+        """What core shows as it emits the record's event, or None if core would not allow it."""
+        self.apply_limit(core, record)
+        guard, action = ACTIONS[record.event]
+        if action is None:
+            return shown(core)
+        if not guard(core):
+            return None
+        self.emitted = None
+        action(core)
+        return self.emitted
+
+    @staticmethod
+    def resync(core, record):
+        totals = record_totals(record)
+        if record.event == NON_POMODORO_STOPPED:
+            # a stopped non-pomodoro block is cleared right after the event is recorded
+            totals = totals._replace(last_non_pomodoro_time=0)
+        restore(core, totals)
+        # a stop or skip has already moved on to the next countdown
+        if (record.current_time is not None and core.state.name == record.state and
+                record.event not in (STOPPED, SKIPPED)):
+            core.state.current_time = record.current_time
+
+    def relocate(self, record):
+        """A core in the record's countdown, for a record that leaves its countdown started or paused."""
+        core = self.new_core(NO_TOTALS)
+        # not a transition of the diagram: the replay lost track of where the app was
+        core.phase = PHASES[record.state]
+        core.state = core.countdowns[core.phase]
+        self.apply_limit(core, record)
+        core.start()
+        if record.event == PAUSED:
+            core.pause_resume()
+        elif record.event == EXPIRED:
+            expire(core)
+        self.resync(core, record)
+        return core
+
+    def replay(self, record):
+        """Replay one record; returns a Mismatch, a Restart, or None if the replayed LCDs agree."""
+        if record.event not in ACTIONS:
+            raise ValueError(f"record {record.seq}: unknown event {record.event}")
+        self.records += 1
+        previous, self.previous = self.previous, record
+        if previous is not None:
+            self.clock.advance(max(0, record.wall_time - previous.wall_time))
+        expected = self.expected(record)
+
+        actual = self.apply(self.core, record)
+        if agree(expected, actual):
+            return None
+        new_day = previous is not None and record_date(previous) != record_date(record)
+        if actual is None or new_day:
+            restarted = self.new_core(record_totals(previous) if previous is not None and not new_day else NO_TOTALS)
+            restarted_actual = self.apply(restarted, record)
+            if agree(expected, restarted_actual):
+                self.core = restarted
+                self.restarts += 1
+                return Restart(record.seq, record.wall_time, record.event,
+                               "new day" if new_day else "a block was still running")
+            if actual is None and restarted_actual is not None:
+                self.core, actual = restarted, restarted_actual
+
+        jitter = actual is not None and within_jitter(record, actual)
+        if (record.event in (STARTED, RESUMED, PAUSED, EXPIRED) and
+                (self.core.state.name != record.state or not self.core.state.started)):
+            self.core = self.relocate(record)
+        else:
+            self.resync(self.core, record)
+        if jitter:
+            self.jitter += 1
+            return None
+        self.mismatches += 1
+        return Mismatch(record.seq, record.wall_time, record.event, expected, actual and actual.lcds)
+
+    def stats(self):
+        return {
+            "records": self.records,
+            "restarts": self.restarts,
+            "jitter": self.jitter,
+            "mismatches": self.mismatches,
+        }
+
+
+def format_mismatch(mismatch):
+    if isinstance(mismatch, Restart):
+        return f"#{mismatch.seq} {mismatch.event}: replayed on a restarted app ({mismatch.reason})"
+    lines = [f"#{mismatch.seq} {mismatch.event}:"]
+    actual = mismatch.actual or (None,)*len(mismatch.expected)
+    for name, expected, replayed in zip(LCD_NAMES, mismatch.expected, actual):
+        if expected is not None and expected != replayed:
+            lines.append(f"  {name}: recorded {expected}, replayed {replayed}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a journal on a virtual clock and diff every LCD value.")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--restarts", action="store_true", help="also list the records replayed after a restart")
+    args = parser.parse_args()
+
+    replay = Replay()
+    first = last = None
+    started = perf_counter()
+    for record in read_records(args.journal):
+        first = first or record
+        last = record
+        difference = replay.replay(record)
+        if difference is None or args.json or (isinstance(difference, Restart) and not args.restarts):
+            continue
+        print(format_mismatch(difference))
+    elapsed = perf_counter() - started
+
+    summary = replay.stats()
+    summary["seconds"] = round(elapsed, 4)
+    if first is not None:
+        summary["speedup"] = round((last.wall_time - first.wall_time) / 1000 / max(elapsed, 1e-9))
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(", ".join(f"{key} {value}" for key, value in summary.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from history import History, DEFAULT_HISTORY_PATH, POMODORO, NON_POMODORO
+from pomodorocore import MINUTES
+
+KINDS = (POMODORO, NON_POMODORO, "short_break", "long_break")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+POMODORO_CODE = KIND_CODES[POMODORO]
+NON_POMODORO_CODE = KIND_CODES[NON_POMODORO]
+HOUR = 60*MINUTES
+DAY = 24*HOUR
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+Sessions = namedtuple("Sessions", "kind ended_at duration interruptions")
+Report = namedtuple("Report", "first_day pomodoro_count pomodoro_time non_pomodoro_time interruptions "
+                              "hour_of_week weekday_pomodoro_time weekday_pomodoro_count "
+                              "interruption_rate focus_ratio longest_streak current_streak")
+
+
+def load_sessions(history, ended_from=0, ended_before=2**62):
+    """Read raw sessions from a History store into parallel NumPy arrays.
+
+    Sessions are placed by ended_at, the time the daily and weekly rollups of
+    History use, so a session running past midnight counts on the same day in both.
+    """
+    rows = history.sessions(ended_from, ended_before)
+    return Sessions(
+        np.fromiter((KIND_CODES.get(row[0], len(KINDS)) for row in rows), dtype=np.int8, count=len(rows)),
+        np.fromiter((row[2] for row in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((row[3] for row in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((row[4] for row in rows), dtype=np.int32, count=len(rows)),
+    )
+
+
+def local_times(ended_at):
+    """Shift UTC milliseconds to local wall-clock milliseconds, honouring DST.
+
+    The UTC offset is looked up once per distinct hour rather than per session.
+    """
+    hours, inverse = np.unique(ended_at // HOUR, return_inverse=True)
+    offsets = np.fromiter(
+        (datetime.fromtimestamp(int(hour)*3600, timezone.utc).astimezone().utcoffset().total_seconds()*1000
+         for hour in hours), dtype=np.int64, count=len(hours))
+    return ended_at + offsets[inverse]
+
+
+def partial_aggregates(sessions, first_day, day_count):
+    """Fixed-shape sums over one slice of the sessions, so slices can be added together."""
+    local = local_times(sessions.ended_at)
+    day = local // DAY - first_day
+    hour_of_week = ((local // DAY + 3) % 7)*24 + (local // HOUR) % 24  # 1970-01-01 was a Thursday
+    pomodoro = sessions.kind == POMODORO_CODE
+    non_pomodoro = sessions.kind == NON_POMODORO_CODE
+    rounded = MINUTES*np.rint(sessions.duration / MINUTES).astype(np.int64)
+    return {
+        "pomodoro_count": np.bincount(day[pomodoro], minlength=day_count),
+        "pomodoro_time": np.bincount(day[pomodoro], weights=rounded[pomodoro], minlength=day_count),
+        "non_pomodoro_time": np.bincount(day[non_pomodoro], weights=rounded[non_pomodoro], minlength=day_count),
+        "interruptions": np.bincount(day[pomodoro], weights=sessions.interruptions[pomodoro], minlength=day_count),
+        "hour_of_week": np.bincount(hour_of_week[pomodoro], weights=rounded[pomodoro], minlength=7*24),
+    }
+
+
+def _partial_aggregates(arguments):
+    return partial_aggregates(*arguments)
+
+
+def streaks(active):
+    """Longest run of consecutive True days, and the run ending on the last day."""
+    if not active.any():
+        return 0, 0
+    padded = np.concatenate(([False], active, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    lengths = edges[1::2] - edges[::2]
+    current = int(lengths[-1]) if active[-1] else 0
+    return int(lengths.max()), current
+
+
+def build_report(sessions, processes=1, chunk_size=250000):
+    """Aggregate sessions per day, hour of week and weekday in vectorized passes.
+
+    With processes > 1 the sessions are split into chunks that are summed in a
+    process pool; this only pays off for histories of millions of sessions.
+    """
+    if len(sessions.ended_at) == 0:
+        raise ValueError("no sessions to report on")
+    # sessions come sorted by end time, so the ends bound the day range
+    first_local, last_local = local_times(sessions.ended_at[[0, -1]])
+    first_day = int(first_local // DAY)
+    day_count = int(last_local // DAY) - first_day + 1
+
+    chunks = [Sessions(*(column[start:start + chunk_size] for column in sessions))
+              for start in range(0, len(sessions.ended_at), chunk_size)]
+    if processes > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(processes) as pool:
+            partials = list(pool.map(_partial_aggregates, [(chunk, first_day, day_count) for chunk in chunks]))
+    else:
+        partials = [partial_aggregates(chunk, first_day, day_count) for chunk in chunks]
+    totals = {key: sum(partial[key] for partial in partials) for key in partials[0]}
+
+    weekday = (np.arange(first_day, first_day + day_count) + 3) % 7
+    pomodoro_count = totals["pomodoro_count"]
+    pomodoro_time = totals["pomodoro_time"].astype(np.int64)
+    non_pomodoro_time = totals["non_pomodoro_time"].astype(np.int64)
+    interruptions = totals["interruptions"].astype(np.int64)
+    longest_streak, current_streak = streaks(pomodoro_count > 0)
+    return Report(
+        first_day=datetime(1970, 1, 1).date() + timedelta(days=first_day),
+        pomodoro_count=pomodoro_count,
+        pomodoro_time=pomodoro_time,
+        non_pomodoro_time=non_pomodoro_time,
+        interruptions=interruptions,
+        hour_of_week=totals["hour_of_week"].astype(np.int64).reshape(7, 24),
+        weekday_pomodoro_time=np.bincount(weekday, weights=pomodoro_time, minlength=7).astype(np.int64),
+        weekday_pomodoro_count=np.bincount(weekday, weights=pomodoro_count, minlength=7).astype(np.int64),
+        interruption_rate=interruptions.sum() / max(1, pomodoro_count.sum()),
+        focus_ratio=pomodoro_time.sum() / max(1, non_pomodoro_time.sum()),
+        longest_streak=longest_streak,
+        current_streak=current_streak,
+    )
+
+
+def format_report(report):
+    active_days = int(np.count_nonzero(report.pomodoro_count))
+    lines = [
+        f"Since {report.first_day}: {int(report.pomodoro_count.sum())} pomodoros on {active_days} days",
+        f"Pomodoro minutes {int(report.pomodoro_time.sum() // MINUTES)}, "
+        f"non-pomodoro minutes {int(report.non_pomodoro_time.sum() // MINUTES)}, "
+        f"focus ratio {report.focus_ratio:.2f}",
+        f"Interruptions per pomodoro {report.interruption_rate:.2f}",
+        f"Longest streak {report.longest_streak} days, current streak {report.current_streak} days",
+        "",
+        "Pomodoro minutes by weekday and hour",
+        "     " + "".join(f"{hour:>5}" for hour in range(24)),
+    ]
+    for weekday, row in zip(WEEKDAYS, report.hour_of_week // MINUTES):
+        lines.append(f"{weekday:<5}" + "".join(f"{minutes:>5}" for minutes in row))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report on recorded pomodoro history.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--days", type=int, help="only the last DAYS days")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    history = History(args.history)
+    ended_from = 0
+    if args.days is not None:
+        ended_from = int((datetime.now() - timedelta(days=args.days)).timestamp()*1000)
+    sessions = load_sessions(history, ended_from)
+    history.close()
+    if len(sessions.ended_at) == 0:
+        print("No sessions recorded.")
+        return
+    print(format_report(build_report(sessions, processes=args.processes)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import heapq
+from itertools import count
+
+
+class DeadlineScheduler:
+    """Min-heap of pending deadlines, at most one per key.
+
+    schedule() and cancel() are O(log n) and O(1); cancelled or replaced
+    entries stay in the heap and are discarded when they reach the top, so
+    a key that has nothing pending costs nothing between events.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.sequence = count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def schedule(self, key, deadline, callback):
+        """Call callback(key) once the clock reaches deadline, replacing anything pending for key."""
+        self.cancel(key)
+        entry = [deadline, next(self.sequence), key, callback]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+
+    def cancel(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[3] = None
+
+    def discard_cancelled(self):
+        heap = self.heap
+        while heap and heap[0][3] is None:
+            heapq.heappop(heap)
+        # keep the heap from filling up with dead entries under heavy rescheduling
+        if len(heap) > 2*len(self.entries) + 64:
+            self.heap = [entry for entry in heap if entry[3] is not None]
+            heapq.heapify(self.heap)
+
+    def next_deadline(self):
+        self.discard_cancelled()
+        return self.heap[0][0] if self.heap else None
+
+    def run_due(self, now):
+        """Fire every callback whose deadline is at or before now; returns how many fired."""
+        fired = 0
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            deadline, _, key, callback = heapq.heappop(heap)
+            if callback is None:
+                continue
+            del self.entries[key]
+            callback(key)
+            fired += 1
+            heap = self.heap
+        return fired
@@ -0,0 +1,114 @@
+import argparse
+import re
+import sys
+
+# States of statediagram.puml
+INITIAL = "[*]"
+POMODORO = "Pomodoro"
+PAUSED = "Paused"
+BLINKING = "Blinking"
+DONE = "Done"
+SHORT_BREAK = "ShortBreak"
+LONG_BREAK = "LongBreak"
+STATES = (POMODORO, PAUSED, BLINKING, DONE, SHORT_BREAK, LONG_BREAK)
+
+# Triggers; Done is left through whichever guard holds for the pomodoro count
+START = "Start"
+PAUSE = "Pause"
+RESUME = "Resume"
+TIMER_EXPIRED = "TimerExpired"
+LIMIT_EXTENDED = "LimitExtended"  # the pomodoro limit was raised past the time already spent
+STOP = "Stop"
+LONG_BREAK_EVERY = 6
+SHORT_BREAK_DUE = f"PomodoroCount % {LONG_BREAK_EVERY} != 0"
+LONG_BREAK_DUE = f"PomodoroCount % {LONG_BREAK_EVERY} == 0"
+BREAK_DUE = (SHORT_BREAK_DUE, LONG_BREAK_DUE)  # indexed by whether a long break is due
+
+DEFAULT_DIAGRAM_PATH = "statediagram.puml"
+
+
+class Transition:
+    __slots__ = ("source", "trigger", "target")
+
+    def __init__(self, source, trigger, target):
+        self.source = source
+        self.trigger = trigger
+        self.target = target
+
+    def __repr__(self):
+        return f"{self.source} --> {self.target} : {self.trigger}"
+
+
+TRANSITIONS = (
+    Transition(INITIAL, START, POMODORO),
+    Transition(POMODORO, PAUSE, PAUSED),
+    Transition(PAUSED, RESUME, POMODORO),
+    Transition(POMODORO, TIMER_EXPIRED, BLINKING),
+    Transition(BLINKING, LIMIT_EXTENDED, POMODORO),
+    Transition(POMODORO, STOP, DONE),
+    Transition(BLINKING, STOP, DONE),
+    Transition(DONE, SHORT_BREAK_DUE, SHORT_BREAK),
+    Transition(DONE, LONG_BREAK_DUE, LONG_BREAK),
+    Transition(SHORT_BREAK, STOP, POMODORO),
+    Transition(SHORT_BREAK, TIMER_EXPIRED, POMODORO),
+    Transition(LONG_BREAK, STOP, POMODORO),
+    Transition(LONG_BREAK, TIMER_EXPIRED, POMODORO),
+)
+
+# (source, trigger) -> target
+TRANSITION_TABLE = {(transition.source, transition.trigger): transition.target for transition in TRANSITIONS}
+
+
+def next_state(state, trigger):
+    try:
+        return TRANSITION_TABLE[state, trigger]
+    except KeyError:
+        raise ValueError(f"no transition from {state} on {trigger}") from None
+
+
+def break_after(pomodoro_count):
+    """The break state reached from Done once pomodoro_count pomodoros are finished."""
+    return TRANSITION_TABLE[DONE, BREAK_DUE[pomodoro_count % LONG_BREAK_EVERY == 0]]
+
+
+def parse_diagram(text):
+    """States and (source, trigger, target) edges of a PlantUML state diagram.
+
+    An edge labelled with a comma separated list of triggers yields one edge per trigger.
+    """
+    states = set(re.findall(r"^\s*state\s+(\w+)", text, re.MULTILINE))
+    edges = set()
+    for source, target, label in re.findall(r"^\s*(\[\*\]|\w+)\s*-+>\s*(\[\*\]|\w+)\s*(?::\s*(.*?))?\s*$",
+                                            text, re.MULTILINE):
+        for trigger in label.split(",") if label else [""]:
+            edges.add((source, trigger.strip(), target))
+    return states, edges
+
+
+def check_diagram(text):
+    """Differences between TRANSITIONS and the diagram, as readable lines; empty if they agree."""
+    states, edges = parse_diagram(text)
+    table = {(transition.source, transition.trigger, transition.target) for transition in TRANSITIONS}
+    problems = [f"state {state} is not in the diagram" for state in sorted(set(STATES) - states)]
+    problems += [f"state {state} is not in the table" for state in sorted(states - set(STATES))]
+    problems += ["{} --> {} : {} is not in the diagram".format(*edge[::2], edge[1]) for edge in sorted(table - edges)]
+    problems += ["{} --> {} : {} is not in the table".format(*edge[::2], edge[1]) for edge in sorted(edges - table)]
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the state machine table against the state diagram.")
+    parser.add_argument("diagram", nargs="?", default=DEFAULT_DIAGRAM_PATH)
+    args = parser.parse_args()
+
+    with open(args.diagram) as diagram_file:
+        problems = check_diagram(diagram_file.read())
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print(f"{len(TRANSITIONS)} transitions match {args.diagram}")
+
+
+if __name__ == '__main__':
+    main()
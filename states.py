@@ -1,28 +1,57 @@
-from PySide2.QtGui import QColor, QPalette
+from time import monotonic_ns
+from stopwatch import Stopwatch
 
 
 class State:
-    def __init__(self, time_limit):
+    __slots__ = ("started", "paused", "non_pomodoro_started", "non_pomodoro_paused", "stopwatch", "time_limit",
+                 "show_blink", "lcd_color", "prefix", "name")
+
+    def __init__(self, time_limit, clock=monotonic_ns):
         self.started = False
         self.paused = False
         self.non_pomodoro_started = False
         self.non_pomodoro_paused = False
-        self.current_time = 0
+        self.stopwatch = Stopwatch(clock)
         self.time_limit = time_limit
         self.show_blink = True
-        self.lcd_color = QPalette()
+        self.lcd_color = "black"
         self.prefix = ""
+        self.name = ""
+
+    @property
+    def current_time(self):
+        return self.stopwatch.elapsed()
+
+    @current_time.setter
+    def current_time(self, value):
+        self.stopwatch.reset(value)
 
 
 class PomodoroState(State):
-    def __init__(self, time_limit):
-        super().__init__(time_limit)
-        self.lcd_color.setColor(QPalette.Foreground, QColor("orangered"))
+    __slots__ = ()
+
+    def __init__(self, time_limit, clock=monotonic_ns):
+        super().__init__(time_limit, clock)
+        self.lcd_color = "orangered"
         self.prefix = "\u2b22"
+        self.name = "pomodoro"
 
 
 class ShortBreakState(State):
-    def __init__(self, time_limit):
-        super().__init__(time_limit)
-        self.lcd_color.setColor(QPalette.Foreground, QColor("yellow"))
+    __slots__ = ()
+
+    def __init__(self, time_limit, clock=monotonic_ns):
+        super().__init__(time_limit, clock)
+        self.lcd_color = "yellow"
         self.prefix = "\u25b2"
+        self.name = "short_break"
+
+
+class LongBreakState(State):
+    __slots__ = ()
+
+    def __init__(self, time_limit, clock=monotonic_ns):
+        super().__init__(time_limit, clock)
+        self.lcd_color = "limegreen"
+        self.prefix = "\u25c6"
+        self.name = "long_break"
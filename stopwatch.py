@@ -0,0 +1,55 @@
+from time import monotonic_ns
+
+NANOSECONDS_PER_MILLISECOND = 1000*1000
+
+
+class Stopwatch:
+    """Accumulates elapsed time from a monotonic clock.
+
+    Time is derived from start/stop timestamps, never from counting ticks,
+    so late or coalesced timer events cannot lose any of it.
+    """
+
+    def __init__(self, clock=monotonic_ns):
+        self.clock = clock
+        self.banked_ns = 0
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self.started_at is not None
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = self.clock()
+
+    def stop(self):
+        if self.started_at is not None:
+            self.banked_ns += self.clock() - self.started_at
+            self.started_at = None
+
+    def elapsed(self):
+        """Elapsed time in milliseconds."""
+        elapsed_ns = self.banked_ns
+        if self.started_at is not None:
+            elapsed_ns += self.clock() - self.started_at
+        return elapsed_ns // NANOSECONDS_PER_MILLISECOND
+
+    def reset(self, value=0):
+        """Set the elapsed time to value milliseconds, keeping the running state."""
+        self.banked_ns = value*NANOSECONDS_PER_MILLISECOND
+        if self.started_at is not None:
+            self.started_at = self.clock()
+
+
+class ManualClock:
+    """A clock that only moves when told to, for simulations and replays."""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, milliseconds):
+        self.now += milliseconds*NANOSECONDS_PER_MILLISECOND
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import uuid
+from history import History, DEFAULT_HISTORY_PATH
+from pomodorocore import MINUTES
+from tasks import normalize_task
+
+DEFAULT_DEVICE_PATH = os.path.join(os.path.expanduser("~"), ".pypomodoro", "device")
+LOG_SUFFIX = ".sessions"
+RUN_INTERVAL = 5*MINUTES  # milliseconds between runs while a front end is open
+
+
+def device_id(path=DEFAULT_DEVICE_PATH):
+    """This machine's id in shared directories, created on first use."""
+    try:
+        with open(path) as device_file:
+            device = device_file.read().strip()
+        if device:
+            return device
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    device = uuid.uuid4().hex
+    with open(path, "w") as device_file:
+        device_file.write(device + "\n")
+    return device
+
+
+def format_session(kind, started_at, ended_at, duration, interruptions, task):
+    return f"{kind}\t{started_at}\t{ended_at}\t{duration}\t{interruptions}\t{normalize_task(task)}\n".encode("utf-8")
+
+
+def parse_session(line):
+    """(kind, started_at, ended_at, duration, interruptions, task); logs from before tasks have no task field."""
+    kind, *fields = line.decode("utf-8").rstrip("\n").split("\t")
+    if len(fields) not in (4, 5):
+        raise ValueError(f"expected 5 or 6 fields, got {len(fields) + 1}")
+    task = fields[4] if len(fields) == 5 else ""
+    return (kind,) + tuple(int(number) for number in fields[:4]) + (task,)
+
+
+def scan_sessions(path, offset=0):
+    """Yield (end_offset, session) for each complete line from offset on.
+
+    A line without its newline is still being written or synced, so scanning
+    stops there and picks it up next time. Complete lines that do not parse
+    are skipped, since sessions do not depend on each other.
+    """
+    with open(path, "rb") as log_file:
+        log_file.seek(offset)
+        for line in log_file:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            try:
+                session = parse_session(line)
+            except ValueError:
+                continue
+            yield offset, session
+
+
+def all_devices_summary(history):
+    """Today's finished sessions of every synced device, as both front ends show them next to their own counters."""
+    totals = history.day_totals()
+    minutes = round((totals.pomodoro_time + totals.non_pomodoro_time) / MINUTES)
+    return f"all devices {totals.pomodoro_count:02d} pomodoros {minutes:03d} min"
+
+
+class Sync:
+    """Merges the histories of several machines through a shared directory.
+
+    Each device only ever appends its own sessions to <directory>/<device>.sessions,
+    so writers never conflict. Both directions are incremental: this history
+    remembers the id of the last session it exported and, for every other
+    device, how many bytes of that device's log it has merged. A session is
+    identified by its device, kind and start time, so merging a log again, or
+    one that was rewritten from the start, adds nothing twice.
+    """
+
+    def __init__(self, history, directory, device=None):
+        self.history = history
+        self.directory = directory
+        self.device = device or device_id()
+        self.log_path = os.path.join(directory, self.device + LOG_SUFFIX)
+
+    def export(self):
+        """Append the sessions recorded here since the last export to this device's log."""
+        sessions = self.history.local_sessions(self.history.watermark(self.device))
+        if not sessions:
+            return 0
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_path, "ab") as log_file:
+            if log_file.tell():
+                self.drop_torn_tail(log_file)
+            log_file.write(b"".join(format_session(*session[1:]) for session in sessions))
+            log_file.flush()
+            os.fsync(log_file.fileno())
+        # a crash before this line only exports the same sessions again, which merging ignores
+        with self.history.connection:
+            self.history.set_watermark(self.device, sessions[-1][0])
+        return len(sessions)
+
+    def drop_torn_tail(self, log_file):
+        with open(self.log_path, "rb") as reader:
+            content = reader.read()
+        if not content.endswith(b"\n"):
+            log_file.truncate(content.rfind(b"\n") + 1)
+
+    def merge(self, device, path):
+        """Merge what another device appended to its log since the last merge."""
+        offset = self.history.watermark(device)
+        if os.path.getsize(path) < offset:
+            offset = 0  # the log was replaced; merging it from the start is safe
+        sessions = []
+        position = offset
+        for position, session in scan_sessions(path, offset):
+            sessions.append(session)
+        if position == offset:
+            return 0
+        return self.history.merge_sessions(device, sessions, position)
+
+    def run(self):
+        exported = self.export()
+        merged = {}
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                device, suffix = os.path.splitext(name)
+                if suffix == LOG_SUFFIX and device != self.device:
+                    merged[device] = self.merge(device, os.path.join(self.directory, name))
+        return {"device": self.device, "exported": exported, "merged": merged}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge pomodoro histories of several machines through a directory.")
+    parser.add_argument("directory", help="directory shared by all devices, e.g. one kept in sync by a file syncer")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument("--device", default=DEFAULT_DEVICE_PATH, help="file holding this machine's id")
+    args = parser.parse_args()
+
+    history = History(args.history)
+    try:
+        print(json.dumps(Sync(history, args.directory, device_id(args.device)).run()))
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
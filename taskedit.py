@@ -0,0 +1,38 @@
+import sys
+from PySide2.QtWidgets import QApplication, QLineEdit, QCompleter
+from PySide2.QtCore import Qt, QStringListModel
+from tasks import TaskIndex
+
+
+class TaskEdit(QLineEdit):
+    """Line edit for a task name whose completions come from a TaskIndex instead of QCompleter's own filtering."""
+
+    def __init__(self, task_index, placeholder=""):
+        super().__init__()
+        self.task_index = task_index
+        self.setPlaceholderText(placeholder)
+
+        self.completions = QStringListModel(self)
+        completer = QCompleter(self.completions, self)
+        # the index already picked and ranked the names, so show them as they are
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setCompleter(completer)
+        self.textEdited.connect(self.update_completions)
+
+    def update_completions(self, text):
+        names = self.task_index.complete(text) if text.strip() else []
+        self.completions.setStringList(names)
+        if names:
+            self.completer().complete()
+
+    def task(self):
+        return self.task_index.canonical(self.text())
+
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    task_edit = TaskEdit(TaskIndex([("Write report", 12), ("Review pull requests", 30), ("Reading", 4)]), "Task")
+    task_edit.editingFinished.connect(lambda: print(f"The task is {task_edit.task()!r}"))
+    task_edit.show()
+    sys.exit(app.exec_())
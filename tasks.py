@@ -0,0 +1,77 @@
+import heapq
+
+COMPLETIONS = 10  # names offered per completion
+
+
+def normalize_task(name):
+    """Task names are stored with single spaces, and never contain tabs or newlines."""
+    return " ".join(name.split())
+
+
+class TrieNode:
+    __slots__ = ("children", "name")
+
+    def __init__(self):
+        self.children = {}
+        self.name = None  # the task name ending here, as it was first written
+
+
+class TaskIndex:
+    """Case-insensitive prefix index over task names, for type-ahead completion.
+
+    A completion walks the prefix, one dict lookup per character, and then only
+    the names below it, which are ranked by how many sessions used them.
+    """
+
+    def __init__(self, names=()):
+        self.root = TrieNode()
+        self.uses = {}
+        for name, uses in names:
+            self.add(name, uses)
+
+    @classmethod
+    def from_history(cls, history):
+        return cls(history.task_names())
+
+    def add(self, name, uses=1):
+        name = normalize_task(name)
+        if not name:
+            return
+        node = self.root
+        for character in name.casefold():
+            child = node.children.get(character)
+            if child is None:
+                child = node.children[character] = TrieNode()
+            node = child
+        if node.name is None:
+            node.name = name
+        self.uses[node.name] = self.uses.get(node.name, 0) + uses
+
+    def find(self, prefix):
+        node = self.root
+        for character in normalize_task(prefix).casefold():
+            node = node.children.get(character)
+            if node is None:
+                return None
+        return node
+
+    def complete(self, prefix, limit=COMPLETIONS):
+        """The most used names starting with prefix, most used first."""
+        node = self.find(prefix)
+        if node is None:
+            return []
+        names = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.name is not None:
+                names.append(node.name)
+            stack.extend(node.children.values())
+        return heapq.nsmallest(limit, names, key=lambda name: (-self.uses[name], name))
+
+    def canonical(self, name):
+        """The stored spelling of a name that is already indexed under any capitalization."""
+        node = self.find(name)
+        if node is None or node.name is None:
+            return normalize_task(name)
+        return node.name
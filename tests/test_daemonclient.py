@@ -0,0 +1,98 @@
+import asyncio
+import select
+import socket
+import threading
+import time
+import pytest
+from daemonclient import DaemonCore
+from pomodorocore import MINUTES, STARTED, PAUSED, STOPPED
+from timerdaemon import TimerDaemon
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    path = str(tmp_path / "daemon.sock")
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(TimerDaemon().serve(socket_path=path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield path
+
+    async def shut_down():
+        server.close()
+        clients = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shut_down(), loop).result(1)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def wait_for_events(core):
+    assert select.select([core.watch], [], [], 1)[0]
+    core.read_events()
+
+
+def test_other_clients_actions_are_replayed(socket_path):
+    first = DaemonCore("alice", socket_path)
+    second = DaemonCore("alice", socket_path)
+    seen = []
+    second.subscribe(lambda event, core: seen.append(event))
+    followed = []
+    second.followers.append(followed.append)
+
+    first.start()
+    wait_for_events(second)
+    assert second.state.started and second.in_pomodoro
+    first.pause_resume()
+    wait_for_events(second)
+    assert second.state.paused
+    second.stop()
+    wait_for_events(first)
+    assert not first.state.started and first.total_pomodoro_count == 1
+    assert seen == [STARTED, PAUSED, STOPPED]
+    assert followed == [STARTED, PAUSED]
+    assert second.total_pomodoro_count == 1 and second.interruption_count == 1
+    first.close()
+    second.close()
+
+
+def test_refused_action_resyncs_from_the_daemon(socket_path):
+    first = DaemonCore("bob", socket_path)
+    second = DaemonCore("bob", socket_path)
+    followed = []
+    second.followers.append(followed.append)
+    first.start()
+    second.start()
+    assert followed == [STARTED, None]
+    assert second.state.started and "not allowed" in second.last_error
+    first.close()
+    second.close()
+
+
+def test_joining_mid_session_and_limits(socket_path):
+    first = DaemonCore("carol", socket_path)
+    first.start()
+    time.sleep(0.01)
+    first.pause_resume()
+    second = DaemonCore("carol", socket_path)
+    assert second.state.paused and second.interruption_count == 1
+    second.set_time_limits(1, 1)
+    third = DaemonCore("carol", socket_path)
+    assert third.expired and third.pomodoro_state.time_limit == 1
+    third.set_time_limits(25*MINUTES, 5*MINUTES)
+    assert not DaemonCore("carol", socket_path).expired
+    for core in (first, second, third):
+        core.close()
+
+
+def test_daemon_going_away_leaves_a_local_core(socket_path):
+    core = DaemonCore("dave", socket_path)
+    core.connection.shutdown(socket.SHUT_RDWR)
+    core.start()
+    assert core.state.started and not core.connected
+    assert core.last_error
+    core.close()
@@ -0,0 +1,57 @@
+import json
+import threading
+import time
+from eventbus import EventBus, load_hooks
+
+
+def write_hooks(tmp_path, text):
+    path = tmp_path / "hooks.json"
+    path.write_text(text)
+    return str(path)
+
+
+def test_bad_hook_is_skipped_and_reported(tmp_path):
+    bus = EventBus()
+    path = write_hooks(tmp_path, json.dumps({"start": [{"cmd": "x"}], "stop": [{"command": ["true"]}]}))
+    assert load_hooks(bus, path) == 1
+    assert list(bus.subscribers) == ["stop"]
+    assert "needs a command or a url" in bus.stats()["last_error"]
+    bus.close()
+
+
+def test_malformed_file_loads_no_hooks(tmp_path):
+    bus = EventBus()
+    assert load_hooks(bus, write_hooks(tmp_path, '{"start": [')) == 0
+    assert bus.stats()["last_error"].startswith(str(tmp_path))
+    assert load_hooks(bus, write_hooks(tmp_path, '[1]')) == 0
+    assert load_hooks(bus, str(tmp_path / "missing.json")) == 0
+    assert bus.subscribers == {}
+    bus.close()
+
+
+def test_close_delivers_queued_events():
+    bus = EventBus()
+    delivered = []
+    bus.subscribe("start", delivered.append)
+    for number in range(20):
+        bus.publish("start", number)
+    assert bus.close()
+    assert sorted(delivered) == list(range(20))
+
+
+def test_close_does_not_wait_for_a_stuck_hook():
+    bus = EventBus(max_pending=2)
+    release = threading.Event()
+    bus.subscribe("start", lambda payload: release.wait())
+    bus.publish("start", 0)
+    bus.publish("start", 1)
+    deadline = time.monotonic() + 5
+    while bus.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # both workers are stuck now, and the queue fills up behind them
+    for number in range(2, 5):
+        bus.publish("start", number)
+    started = time.monotonic()
+    assert not bus.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+    release.set()
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+import pytest
+from history import History, POMODORO, NON_POMODORO, RollupTotals, TaskTotals, week_key
+from pomodorocore import MINUTES
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History(str(tmp_path / "history.sqlite3"))
+    yield history
+    history.close()
+
+
+def at(day, hour, minute=0):
+    return int((datetime.combine(day, datetime.min.time()) + timedelta(hours=hour, minutes=minute)).timestamp()*1000)
+
+
+def add_pomodoro(history, day, hour, minutes=25, interruptions=0, task=""):
+    ended_at = at(day, hour)
+    history.add_session(POMODORO, ended_at - minutes*MINUTES, ended_at, minutes*MINUTES, interruptions, task)
+
+
+def test_rollups_count_rounded_minutes(history):
+    day = date(2026, 10, 14)
+    add_pomodoro(history, day, 9, interruptions=2)
+    history.add_session(POMODORO, at(day, 10), at(day, 10, 30), 29*MINUTES + 31000)
+    history.add_session(NON_POMODORO, at(day, 11), at(day, 11, 10), 9*MINUTES + 29000)
+    history.add_session("short_break", at(day, 11, 10), at(day, 11, 16), 6*MINUTES)
+
+    assert history.day_totals(day) == RollupTotals(2, 55*MINUTES, 9*MINUTES, 2)
+    assert history.day_totals(day + timedelta(days=1)) == RollupTotals(0, 0, 0, 0)
+
+
+def test_same_session_is_inserted_once(history):
+    day = date(2026, 10, 14)
+    for _ in range(2):
+        add_pomodoro(history, day, 9, task="Write report")
+    with history.connection:
+        assert not history.insert_session(POMODORO, at(day, 9) - 25*MINUTES, at(day, 9), 25*MINUTES, 0, "", "")
+        # the same start on another device is another session
+        assert history.insert_session(POMODORO, at(day, 9) - 25*MINUTES, at(day, 9), 25*MINUTES, 0, "", "laptop")
+
+    assert history.day_totals(day).pomodoro_count == 2
+    assert history.task_totals("Write report", day)[0] == TaskTotals(1, 25*MINUTES, 0)
+    assert history.task_names() == [("Write report", 1)]
+
+
+@pytest.mark.parametrize("day, key", [(date(2026, 10, 14), "2026-W42"), (date(2026, 1, 1), "2026-W01"),
+                                      (date(2027, 1, 1), "2026-W53"), (date(2024, 12, 30), "2025-W01")])
+def test_week_key_is_the_iso_week(day, key):
+    assert week_key(day) == key
+
+
+def test_week_totals_span_monday_to_sunday(history):
+    monday = date(2026, 10, 12)
+    for offset in range(8):
+        add_pomodoro(history, monday + timedelta(days=offset), 9)
+
+    assert history.week_totals(monday).pomodoro_count == 7
+    assert history.week_totals(monday + timedelta(days=6)).pomodoro_count == 7
+    assert history.week_totals(monday + timedelta(days=7)).pomodoro_count == 1
+
+
+def test_range_totals_include_both_ends(history):
+    first = date(2026, 10, 1)
+    for offset in range(10):
+        add_pomodoro(history, first + timedelta(days=offset), 9, minutes=20 + offset)
+
+    assert history.range_totals(first + timedelta(days=2), first + timedelta(days=4)) == \
+        RollupTotals(3, (22 + 23 + 24)*MINUTES, 0, 0)
+    assert history.range_totals(date(2025, 1, 1), date(2025, 12, 31)) == RollupTotals(0, 0, 0, 0)
+    assert history.last_year_totals(first + timedelta(days=9)).pomodoro_count == 10
+    assert [day for day, _ in history.daily_rollups(first, first + timedelta(days=2))] == \
+        [first, first + timedelta(days=1), first + timedelta(days=2)]
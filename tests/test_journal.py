@@ -0,0 +1,98 @@
+import time
+from journal import Journal, read_records, record_totals
+from pomodorocore import PomodoroCore, MINUTES, STARTED, STOPPED
+from stopwatch import ManualClock
+
+
+def write_pomodoros(path, count=2):
+    clock = ManualClock()
+    core = PomodoroCore(clock=clock)
+    journal = Journal(path, sync_interval=0.01)
+    core.subscribe(journal.record)
+    for _ in range(count):
+        core.start()
+        clock.advance(25*MINUTES)
+        core.stop()
+        core.skip()
+    assert journal.close() == 0
+    return core
+
+
+class FailingOnce:
+    """A journal file whose first write fails, like a full disk that is freed again."""
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.failed = False
+
+    def write(self, data):
+        if not self.failed:
+            self.failed = True
+            raise OSError(28, "No space left on device")
+        return self.journal_file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.journal_file, name)
+
+
+def test_records_carry_totals_and_countdown(tmp_path):
+    path = str(tmp_path / "journal.log")
+    core = write_pomodoros(path)
+    records = list(read_records(path))
+    assert [record.seq for record in records] == list(range(1, len(records) + 1))
+    assert records[0].event == STARTED
+    last_stop = [record for record in records if record.event == STOPPED and record.state == "pomodoro"][-1]
+    assert record_totals(last_stop).total_pomodoro_count == core.total_pomodoro_count
+    assert last_stop.time_limit == core.pomodoro_state.time_limit
+
+
+def test_truncated_line_is_cut_off_on_recovery(tmp_path):
+    path = str(tmp_path / "journal.log")
+    write_pomodoros(path)
+    records = list(read_records(path))
+    with open(path, "rb") as journal_file:
+        intact = journal_file.read()
+    with open(path, "ab") as journal_file:
+        journal_file.write(b"%d\t1700000000000\tstart\tpomo" % (records[-1].seq + 1))
+
+    journal = Journal(path)
+    assert journal.recovered == records[-1]
+    assert journal.seq == records[-1].seq
+    journal.close()
+    with open(path, "rb") as journal_file:
+        assert journal_file.read() == intact
+
+
+def test_corrupt_line_ends_the_log(tmp_path):
+    path = str(tmp_path / "journal.log")
+    write_pomodoros(path)
+    records = list(read_records(path))
+    lines = open(path, "rb").read().splitlines(keepends=True)
+    lines[2] = b"garbage\n"
+    with open(path, "wb") as journal_file:
+        journal_file.write(b"".join(lines))
+
+    assert list(read_records(path)) == records[:2]
+    journal = Journal(path)
+    assert journal.recovered == records[1]
+    journal.close()
+
+
+def test_failed_write_is_retried(tmp_path):
+    path = str(tmp_path / "journal.log")
+    journal = Journal(path, sync_interval=0.01)
+    journal.journal_file = FailingOnce(journal.journal_file)
+    core = PomodoroCore(clock=ManualClock())
+    core.subscribe(journal.record)
+    core.start()
+    deadline = time.monotonic() + 5
+    while journal.stats()["unwritten"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert journal.stats()["unwritten"] == 1
+    assert journal.stats()["write_errors"] == 1
+    core.stop()
+
+    assert journal.close() == 0
+    assert journal.stats()["write_errors"] == 1
+    assert "No space left" in journal.stats()["last_error"]
+    assert [record.seq for record in read_records(path)] == [1, 2]
@@ -0,0 +1,87 @@
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from history import History, POMODORO, NON_POMODORO
+from pomodorocore import MINUTES
+from reports import build_report, load_sessions
+
+
+@pytest.fixture(autouse=True)
+def berlin(monkeypatch):
+    # a zone with DST, so the day and hour bucketing is checked across a clock change
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = History(str(tmp_path / "history.sqlite3"))
+    yield history
+    history.close()
+
+
+def milliseconds(*fields):
+    return int(datetime(*fields).timestamp()*1000)
+
+
+def at(day, hour=0, minute=0):
+    return milliseconds(day.year, day.month, day.day, hour, minute)
+
+
+def add_pomodoro(history, ended_at, minutes=25, interruptions=0):
+    history.add_session(POMODORO, ended_at - minutes*MINUTES, ended_at, minutes*MINUTES, interruptions)
+
+
+def report_days(report):
+    return {report.first_day + timedelta(days=day): (int(count), int(pomodoro_time), int(non_pomodoro_time),
+                                                     int(interruptions))
+            for day, (count, pomodoro_time, non_pomodoro_time, interruptions) in enumerate(zip(
+                report.pomodoro_count, report.pomodoro_time, report.non_pomodoro_time, report.interruptions))
+            if count or pomodoro_time or non_pomodoro_time}
+
+
+def test_session_crossing_midnight_counts_on_the_day_it_ends(history):
+    add_pomodoro(history, milliseconds(2026, 10, 16, 0, 10))
+    add_pomodoro(history, milliseconds(2026, 10, 16, 9, 30))
+
+    report = build_report(load_sessions(history))
+    assert report.first_day == date(2026, 10, 16)
+    assert report.pomodoro_count.tolist() == [2]
+    # 2026-10-16 is a Friday; the hour of week is the hour the pomodoro ended
+    assert report.hour_of_week[4, 0] == 25*MINUTES
+    assert report.hour_of_week[3].sum() == 0
+
+
+def test_hour_of_week_follows_the_clock_change(history):
+    # Berlin moves from UTC+1 to UTC+2 at 02:00 on Sunday 2026-03-29
+    add_pomodoro(history, milliseconds(2026, 3, 29, 1, 30))
+    add_pomodoro(history, milliseconds(2026, 3, 29, 3, 30))
+
+    report = build_report(load_sessions(history))
+    assert report.pomodoro_count.tolist() == [2]
+    assert report.hour_of_week[6, 1] == 25*MINUTES
+    assert report.hour_of_week[6, 3] == 25*MINUTES
+
+
+def test_report_matches_daily_rollups(history):
+    first = date(2026, 3, 20)
+    rng = np.random.default_rng(3)
+    for day in range(21):
+        for _ in range(rng.integers(0, 6)):
+            # ending at any second of the day
+            ended_at = at(first + timedelta(days=day)) + int(rng.integers(0, 24*60))*MINUTES
+            add_pomodoro(history, ended_at + int(rng.integers(0, 59000)), int(rng.integers(5, 40)),
+                         int(rng.integers(0, 3)))
+        if day % 2:
+            add_pomodoro(history, at(first + timedelta(days=day), 0, 5))
+        if day % 3 == 0:
+            ended_at = at(first + timedelta(days=day), 18)
+            history.add_session(NON_POMODORO, ended_at - 13*MINUTES, ended_at, 13*MINUTES + 29000)
+
+    report = build_report(load_sessions(history))
+    rollups = {day: tuple(totals) for day, totals in history.daily_rollups(first, first + timedelta(days=21))}
+    assert report_days(report) == rollups
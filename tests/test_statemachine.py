@@ -0,0 +1,72 @@
+import os
+import pytest
+import statemachine
+from pomodorocore import PomodoroCore, MINUTES
+from stopwatch import ManualClock
+
+DIAGRAM_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "statediagram.puml")
+
+
+def read_diagram():
+    with open(DIAGRAM_PATH) as diagram_file:
+        return diagram_file.read()
+
+
+def finish_pomodoro(core, clock):
+    core.start()
+    clock.advance(25*MINUTES)
+    core.stop()
+
+
+def test_table_matches_diagram():
+    assert statemachine.check_diagram(read_diagram()) == []
+
+
+def test_missing_edge_is_reported():
+    text = read_diagram().replace("Blinking --> Pomodoro : LimitExtended\n", "")
+    assert statemachine.check_diagram(text) == ["Blinking --> Pomodoro : LimitExtended is not in the diagram"]
+
+
+@pytest.mark.parametrize("count, expected", [(1, statemachine.SHORT_BREAK), (5, statemachine.SHORT_BREAK),
+                                             (6, statemachine.LONG_BREAK), (7, statemachine.SHORT_BREAK),
+                                             (12, statemachine.LONG_BREAK)])
+def test_break_after(count, expected):
+    assert statemachine.break_after(count) == expected
+
+
+def test_sixth_pomodoro_is_followed_by_a_long_break():
+    clock = ManualClock()
+    core = PomodoroCore(clock=clock)
+    for number in range(1, 7):
+        finish_pomodoro(core, clock)
+        if number < 6:
+            assert core.phase == statemachine.SHORT_BREAK
+            assert core.state is core.short_break_state
+            core.skip()
+    assert core.total_pomodoro_count == 6
+    assert core.phase == statemachine.LONG_BREAK
+    assert core.state is core.long_break_state
+    assert core.state.time_limit == 60*MINUTES  # Design.md: a long break starts at 60:00
+
+    core.start()
+    core.stop()
+    assert core.phase == statemachine.POMODORO
+
+
+def test_longer_limit_takes_an_expired_pomodoro_back():
+    clock = ManualClock()
+    core = PomodoroCore(pomodoro_time=25*MINUTES, clock=clock)
+    core.start()
+    clock.advance(26*MINUTES)
+    assert core.tick()
+    assert core.phase == statemachine.BLINKING
+
+    core.set_time_limits(30*MINUTES, core.short_break_state.time_limit)
+    assert core.phase == statemachine.POMODORO
+    assert not core.tick()
+    assert core.can_pause_resume()
+
+
+def test_undefined_transition_is_refused():
+    with pytest.raises(ValueError, match="no transition from Blinking on Pause"):
+        statemachine.next_state(statemachine.BLINKING, statemachine.PAUSE)
@@ -0,0 +1,85 @@
+import os
+from datetime import date, datetime, timedelta
+from history import History, POMODORO, NON_POMODORO
+from pomodorocore import MINUTES
+from sync import Sync, all_devices_summary, format_session
+
+
+def make_sync(tmp_path, device):
+    history = History(str(tmp_path / f"{device}.sqlite3"))
+    return Sync(history, str(tmp_path / "shared"), device)
+
+
+def add_sessions(history, count, kind=POMODORO):
+    # from noon on, so every session ends today
+    noon = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=12)
+    for number in range(len(history.local_sessions(0)), len(history.local_sessions(0)) + count):
+        started_at = int(noon.timestamp()*1000) + number*40*MINUTES
+        history.add_session(kind, started_at, started_at + 25*MINUTES, 25*MINUTES, task="Write report")
+
+
+def test_merging_the_same_log_twice_adds_nothing(tmp_path):
+    laptop, desktop = make_sync(tmp_path, "laptop"), make_sync(tmp_path, "desktop")
+    add_sessions(laptop.history, 3)
+    assert laptop.run()["exported"] == 3
+
+    assert desktop.run()["merged"] == {"laptop": 3}
+    totals = desktop.history.day_totals()
+    assert totals.pomodoro_count == 3
+    assert desktop.run()["merged"] == {"laptop": 0}
+
+    # forgetting the watermark merges the whole log again, which the session identity makes harmless
+    with desktop.history.connection:
+        desktop.history.set_watermark("laptop", 0)
+    assert desktop.run()["merged"] == {"laptop": 0}
+    assert desktop.history.day_totals() == totals
+    assert desktop.history.task_totals("Write report")[0].pomodoro_count == 3
+
+
+def test_rewritten_log_is_merged_from_the_start(tmp_path):
+    laptop, desktop = make_sync(tmp_path, "laptop"), make_sync(tmp_path, "desktop")
+    add_sessions(laptop.history, 3)
+    laptop.run()
+    desktop.run()
+
+    # the log is replaced by a shorter one holding one of the known sessions and a new one
+    with open(laptop.log_path, "rb") as log_file:
+        first_line = log_file.readline()
+    add_sessions(laptop.history, 1, NON_POMODORO)
+    new_line = laptop.history.local_sessions(3)[0][1:]
+    with open(laptop.log_path, "wb") as log_file:
+        log_file.write(first_line + format_session(*new_line))
+
+    assert desktop.run()["merged"] == {"laptop": 1}
+    totals = desktop.history.day_totals()
+    assert totals.pomodoro_count == 3
+    assert totals.non_pomodoro_time == 25*MINUTES
+
+
+def test_torn_line_waits_for_the_next_run(tmp_path):
+    laptop, desktop = make_sync(tmp_path, "laptop"), make_sync(tmp_path, "desktop")
+    add_sessions(laptop.history, 2)
+    laptop.run()
+    with open(laptop.log_path, "rb") as log_file:
+        lines = log_file.readlines()
+    with open(laptop.log_path, "wb") as log_file:
+        log_file.write(lines[0] + lines[1][:10])
+
+    assert desktop.run()["merged"] == {"laptop": 1}
+    with open(laptop.log_path, "ab") as log_file:
+        log_file.write(lines[1][10:])
+    assert desktop.run()["merged"] == {"laptop": 1}
+    assert desktop.history.day_totals().pomodoro_count == 2
+
+
+def test_merged_sessions_do_not_seed_the_local_counters(tmp_path):
+    laptop, desktop = make_sync(tmp_path, "laptop"), make_sync(tmp_path, "desktop")
+    add_sessions(laptop.history, 3)
+    add_sessions(desktop.history, 1)
+    laptop.run()
+    desktop.run()
+
+    assert desktop.history.day_totals().pomodoro_count == 4
+    assert desktop.history.today_totals().total_pomodoro_count == 1
+    assert all_devices_summary(desktop.history) == "all devices 04 pomodoros 100 min"
+    assert os.path.exists(desktop.log_path)
@@ -0,0 +1,41 @@
+from tasks import TaskIndex, normalize_task
+
+
+def make_index():
+    return TaskIndex([("Write report", 12), ("Review pull requests", 30), ("Reading", 4), ("write tests", 12)])
+
+
+def test_completion_ranks_by_uses_then_name():
+    index = make_index()
+    assert index.complete("re") == ["Review pull requests", "Reading"]
+    assert index.complete("w") == ["Write report", "write tests"]
+    assert index.complete("") == ["Review pull requests", "Write report", "write tests", "Reading"]
+
+
+def test_completion_ignores_case_and_spacing():
+    index = make_index()
+    assert index.complete("REVIEW   pull") == ["Review pull requests"]
+    assert index.complete("x") == []
+
+
+def test_completion_limit():
+    index = TaskIndex((f"Task {number:02d}", number) for number in range(30))
+    assert index.complete("task", limit=3) == ["Task 29", "Task 28", "Task 27"]
+
+
+def test_first_spelling_is_kept_and_uses_add_up():
+    index = make_index()
+    index.add("  reading ")
+    index.add("Reading", 5)
+    assert index.canonical("READING") == "Reading"
+    assert index.uses["Reading"] == 10
+    assert index.complete("rea") == ["Reading"]
+
+
+def test_unknown_names_are_only_normalized():
+    index = make_index()
+    assert index.canonical(" New\ttask ") == "New task"
+    assert index.canonical("Writ") == "Writ"
+    index.add("   ")
+    assert "" not in index.uses
+    assert normalize_task("a \n b") == "a b"
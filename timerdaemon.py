@@ -0,0 +1,198 @@
+import argparse
+import asyncio
+import json
+import os
+from time import monotonic_ns
+from pomodorocore import PomodoroCore, STARTED, RESUMED, PAUSED, STOPPED, SKIPPED
+from scheduler import DeadlineScheduler
+from stopwatch import NANOSECONDS_PER_MILLISECOND
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser("~"), ".pypomodoro", "daemon.sock")
+
+# command name -> (guard, action) on PomodoroCore
+COMMANDS = {
+    "start": (PomodoroCore.can_start, PomodoroCore.start),
+    "stop": (PomodoroCore.can_stop, PomodoroCore.stop),
+    "skip": (PomodoroCore.can_start, PomodoroCore.skip),
+    "pause_resume": (PomodoroCore.can_pause_resume, PomodoroCore.pause_resume),
+    "non_pomodoro_start": (PomodoroCore.can_non_pomodoro_start, PomodoroCore.non_pomodoro_start),
+    "non_pomodoro_stop": (PomodoroCore.can_non_pomodoro_stop, PomodoroCore.non_pomodoro_stop),
+}
+
+
+class CommandError(Exception):
+    pass
+
+
+def snapshot(name, core):
+    state = core.state
+    return {
+        "session": name,
+        "state": state.name,
+        "started": state.started,
+        "paused": state.paused,
+        "non_pomodoro_started": state.non_pomodoro_started,
+        "expired": core.expired,
+        "current_time": state.current_time,
+        "time_limit": state.time_limit,
+        "totals": core.totals()._asdict(),
+    }
+
+
+class TimerDaemon:
+    """Hosts many independent PomodoroCore sessions behind a line-delimited JSON protocol.
+
+    Each request is one line, {"id": ..., "session": ..., "command": ...}, and gets
+    exactly one response line echoing the id. Sessions are created on first use.
+    Clients that send the "watch" command also receive {"session", "event"}
+    lines for every session event, including expiries fired by the daemon.
+    "set_time_limits" takes the limits in milliseconds, as PomodoroCore.set_time_limits does.
+
+    Pending expiries of all sessions share one DeadlineScheduler and a single
+    event-loop timer armed for the earliest of them, so the clock must be the
+    one asyncio uses, time.monotonic, in nanoseconds.
+    """
+
+    def __init__(self, clock=monotonic_ns):
+        self.clock = clock
+        self.sessions = {}
+        self.scheduler = DeadlineScheduler()
+        self.wakeup = None
+        self.wakeup_deadline = None
+        self.watchers = set()
+
+    def session(self, name):
+        core = self.sessions.get(name)
+        if core is None:
+            core = self.sessions[name] = PomodoroCore(clock=self.clock)
+            core.subscribe(lambda event, core: self.on_event(name, event, core))
+        return core
+
+    def on_event(self, name, event, core):
+        if event in (STARTED, RESUMED):
+            self.schedule_expiry(name, core)
+        elif event in (PAUSED, STOPPED, SKIPPED):
+            self.cancel_expiry(name)
+        if self.watchers:
+            line = (json.dumps({"session": name, "event": event}) + "\n").encode()
+            for writer in self.watchers:
+                writer.write(line)
+
+    def schedule_expiry(self, name, core):
+        remaining = max(0, core.state.time_limit - core.state.current_time)
+        self.scheduler.schedule(name, self.clock() + remaining*NANOSECONDS_PER_MILLISECOND, self.expire)
+        self.arm_wakeup()
+
+    def cancel_expiry(self, name):
+        # the armed wakeup is left alone; if it was for this session it finds nothing due
+        self.scheduler.cancel(name)
+
+    def arm_wakeup(self):
+        deadline = self.scheduler.next_deadline()
+        if deadline is None or (self.wakeup_deadline is not None and self.wakeup_deadline <= deadline):
+            return
+        if self.wakeup is not None:
+            self.wakeup.cancel()
+        self.wakeup_deadline = deadline
+        self.wakeup = asyncio.get_running_loop().call_at(deadline / 1e9, self.run_due)
+
+    def run_due(self):
+        self.wakeup = None
+        self.wakeup_deadline = None
+        self.scheduler.run_due(self.clock())
+        self.arm_wakeup()
+
+    def expire(self, name):
+        core = self.sessions.get(name)
+        if core is not None and core.state.started and not core.state.paused:
+            core.tick()
+
+    def handle(self, request):
+        command = request.get("command")
+        if not isinstance(command, str):
+            raise CommandError("missing command")
+        if command == "list":
+            return {"sessions": sorted(self.sessions)}
+        name = request.get("session")
+        if not isinstance(name, str):
+            raise CommandError("missing session")
+        if command == "status":
+            return snapshot(name, self.session(name))
+        if command == "set_time_limits":
+            core = self.session(name)
+            limits = [request.get(key) for key in ("pomodoro_time", "short_break_time", "long_break_time")]
+            if not all(type(limit) is int for limit in limits[:2]) or not (limits[2] is None or type(limits[2]) is int):
+                raise CommandError("time limits must be integers (milliseconds)")
+            core.set_time_limits(*limits)
+            if core.state.started and not core.state.paused:
+                # the pending expiry moves with the limit, or fires right away if the limit is now behind
+                self.schedule_expiry(name, core)
+            return snapshot(name, core)
+        if command == "close":
+            self.cancel_expiry(name)
+            self.sessions.pop(name, None)
+            return {"session": name}
+        if command not in COMMANDS:
+            raise CommandError(f"unknown command {command!r}")
+        core = self.session(name)
+        guard, action = COMMANDS[command]
+        if not guard(core):
+            raise CommandError(f"{command} is not allowed in the current state")
+        action(core)
+        return snapshot(name, core)
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise CommandError("request must be a JSON object")
+                    if request.get("command") == "watch":
+                        self.watchers.add(writer)
+                        response = {"ok": True}
+                    else:
+                        response = {"ok": True, "result": self.handle(request)}
+                except (CommandError, ValueError) as error:
+                    request = request if isinstance(request, dict) else {}
+                    response = {"ok": False, "error": str(error)}
+                response["id"] = request.get("id")
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.watchers.discard(writer)
+            writer.close()
+
+    async def serve(self, socket_path=None, host="127.0.0.1", port=None):
+        if port is None:
+            socket_path = socket_path or DEFAULT_SOCKET_PATH
+            os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            return await asyncio.start_unix_server(self.serve_client, socket_path)
+        return await asyncio.start_server(self.serve_client, host, port)
+
+
+async def run(args):
+    daemon = TimerDaemon()
+    server = await daemon.serve(socket_path=args.socket, host=args.host, port=args.port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve pomodoro timers for many sessions.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path (default)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="listen on host:port instead of the Unix socket")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()